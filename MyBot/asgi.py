@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+MediBot - async serving mode
+ASGI entry point: /ask runs as a coroutine so in-flight chats share the event
+loop instead of each holding a worker thread; every other route is served by
+the Flask app from main.py. Each worker warms up in the background (see
+main.create_app), poll /ready before sending traffic.
+
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 5001 --workers 2
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+import main
+import metrics
+from main import CORS_EXPOSE_HEADERS, CORS_ORIGINS, existing_chat_id, record_exchange
+
+
+def in_app_context(fn, *args):
+    """Run a database helper from main.py inside a Flask app context"""
+    with main.app.app_context():
+        return fn(*args)
+
+
+async def generate_answer(question):
+    bot = main.bot
+    if hasattr(bot, "ask_async"):
+        return await bot.ask_async(question)
+    return await asyncio.to_thread(bot.ask, question)
+
+
+async def ask(request):
+    """Ask MediBot a question (async version of main.ask), traced like the Flask routes"""
+    trace, token = metrics.start_trace("ask")
+    try:
+        response = await answer_question(request)
+    finally:
+        metrics.end_trace(token)
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - trace.started,
+                                    endpoint=trace.name, status=response.status_code)
+    response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+
+async def answer_question(request):
+    try:
+        data = await request.json()
+    except Exception:
+        data = None
+    if not data:
+        return JSONResponse({"error": "No JSON data provided"}, status_code=400)
+
+    question = str(data.get("question", "")).strip()
+    if not question:
+        return JSONResponse({"error": "Empty question"}, status_code=400)
+
+    if not main.bot:
+        return JSONResponse({"error": "Chatbot system is not available."}, status_code=503)
+
+    try:
+        asked_at = datetime.utcnow()
+        # Loading the chat runs alongside retrieval and the model call
+        chat_id, answer = await asyncio.gather(
+            asyncio.to_thread(in_app_context, existing_chat_id, data.get("chat_id")),
+            generate_answer(question)
+        )
+        # One transaction for both messages and the chat update
+        chat_id = await asyncio.to_thread(in_app_context, record_exchange, chat_id, question, answer, asked_at)
+        if chat_id is None:
+            return JSONResponse({"error": "Chat not found"}, status_code=404)
+
+        return JSONResponse({"answer": answer, "chat_id": chat_id})
+    except Exception as e:
+        print(f"Error in async ask endpoint: {e}")
+        return JSONResponse({"error": "Internal server error"}, status_code=500)
+
+
+app = Starlette(
+    routes=[
+        Route("/ask", ask, methods=["POST"]),
+        Mount("/", app=WSGIMiddleware(main.create_app()))
+    ],
+    # Covers the mounted Flask routes too (their preflights never reach Flask)
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=CORS_ORIGINS, allow_credentials=True,
+                   allow_methods=["*"], allow_headers=["*"], expose_headers=CORS_EXPOSE_HEADERS)
+    ]
+)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Chat-history query times before and after the schema migrations.
+
+    python benchmarks/bench_chat_indexes.py --messages 1000000 --chats 10000
+
+Builds a synthetic database with the pre-migration schema (no indexes,
+user_version 0), times the per-chat queries used by main.py, applies
+migrations.migrate() to the same file and times them again. Prints a JSON
+report with the median time per query in milliseconds (null when a query
+ran past --budget seconds, as the unindexed chat list does at 1M messages).
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from migrations import migrate  # noqa: E402
+
+# Tables as created by db.create_all() before the migrations existed
+SCHEMA = """
+CREATE TABLE chat (
+    id INTEGER NOT NULL PRIMARY KEY,
+    title VARCHAR(200),
+    created_at DATETIME,
+    last_accessed DATETIME
+);
+CREATE TABLE message (
+    id INTEGER NOT NULL PRIMARY KEY,
+    chat_id INTEGER NOT NULL REFERENCES chat (id),
+    role VARCHAR(20),
+    content TEXT,
+    timestamp DATETIME
+);
+"""
+
+QUERIES = {
+    # load_chat / activate_chat
+    "load_chat": "SELECT id, role, content, timestamp FROM message "
+                 "WHERE chat_id = :chat ORDER BY timestamp ASC",
+    # first page of /chat/list (same shape as main.chat_listing_query)
+    "list_chats_page": """
+        SELECT chat.id, chat.title, first.role, substr(first.content, 1, 41),
+               (SELECT max(timestamp) FROM message WHERE message.chat_id = chat.id),
+               (SELECT count(id) FROM message WHERE message.chat_id = chat.id)
+        FROM chat LEFT OUTER JOIN message AS first ON first.id = (
+            SELECT id FROM message WHERE message.chat_id = chat.id
+            ORDER BY timestamp ASC, id ASC LIMIT 1)
+        ORDER BY chat.last_accessed DESC, chat.id DESC LIMIT 51
+    """,
+    "message_count": "SELECT count(id) FROM message WHERE chat_id = :chat",
+    # delete_chat (rolled back after timing)
+    "delete_chat_messages": "DELETE FROM message WHERE chat_id = :chat",
+}
+
+
+def fmt(ts):
+    # SQLAlchemy's SQLite DateTime storage format
+    return ts.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def build(path, chats, messages):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    start = datetime(2025, 1, 1)
+    rng = random.Random(42)
+
+    conn.executemany(
+        "INSERT INTO chat (id, title, created_at, last_accessed) VALUES (?, ?, ?, ?)",
+        ((i, "New Chat", fmt(start + timedelta(minutes=i)),
+          fmt(start + timedelta(minutes=i, seconds=rng.randrange(86400 * 30))))
+         for i in range(1, chats + 1))
+    )
+
+    def rows():
+        # Interleave chats the way live traffic does
+        for i in range(messages):
+            yield (rng.randrange(1, chats + 1), "user" if i % 2 == 0 else "assistant",
+                   f"synthetic message {i} about appointments and diagnostic reports",
+                   fmt(start + timedelta(seconds=i)))
+
+    conn.executemany("INSERT INTO message (chat_id, role, content, timestamp) VALUES (?, ?, ?, ?)", rows())
+    conn.commit()
+    conn.close()
+
+
+def time_queries(path, chats, repeat, budget):
+    """Median ms per query; None when a run exceeds the budget (seconds) and is aborted"""
+    conn = sqlite3.connect(path)
+    rng = random.Random(7)
+    results = {}
+    for name, sql in QUERIES.items():
+        samples = []
+        for _ in range(repeat):
+            params = {"chat": rng.randrange(1, chats + 1)}
+            abort_at = time.perf_counter() + budget
+            conn.set_progress_handler(lambda: time.perf_counter() > abort_at, 10000)
+            start = time.perf_counter()
+            try:
+                conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError:
+                samples = None
+                break
+            finally:
+                conn.rollback()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = round(statistics.median(samples), 3) if samples else None
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat query times before/after migrations")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--chats", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=60.0,
+                        help="seconds before a single query is aborted (reported as null)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "bench.db")
+        start = time.perf_counter()
+        build(path, args.chats, args.messages)
+        print(f"built {args.messages} messages in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+        before = time_queries(path, args.chats, args.repeat, args.budget)
+
+        engine = create_engine(f"sqlite:///{path}")
+        start = time.perf_counter()
+        version = migrate(engine)
+        migration_seconds = time.perf_counter() - start
+        engine.dispose()
+
+        after = time_queries(path, args.chats, args.repeat, args.budget)
+
+    print(json.dumps({
+        "messages": args.messages,
+        "chats": args.chats,
+        "schema_version": version,
+        "migration_seconds": round(migration_seconds, 3),
+        "median_ms": {
+            name: {"before": before[name], "after": after[name],
+                   "speedup": round(before[name] / after[name], 1) if before[name] and after[name] else None}
+            for name in QUERIES
+        }
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Accuracy and speed of the EmbeddingModel backends (torch fp32 vs dynamic int8).
+
+    python benchmarks/bench_embedding_backends.py --threads 4 --repeat 3
+
+Encodes the sentences of data/text_files plus the questions in
+benchmarks/questions.json with every backend. Reports:
+  - throughput in sentences/s for batched (ingestion-style) encodes and for
+    one-sentence (query-style) encodes, with p50/p95 latency of the latter;
+  - cosine drift of each backend's vectors against the fp32 vectors of the
+    same sentence (mean, p99 and max of 1 - cos);
+  - top-k agreement: how many of fp32's top-k corpus sentences for each
+    question the backend also returns.
+Prints a JSON report.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+import numpy as np
+
+MYBOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(MYBOT, "src"))
+
+from embedding import BACKENDS, DEFAULT_MODEL, EmbeddingModel  # noqa: E402
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def corpus_sentences(text_dir):
+    sentences = []
+    for path in sorted(glob.glob(os.path.join(text_dir, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            for sentence in re.split(r"(?<=[.!?])\s+|\n+", f.read()):
+                if len(sentence.split()) >= 3:
+                    sentences.append(sentence.strip())
+    return sentences
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def measure(model, sentences, queries, batch_size, repeat):
+    model.encode_queries(sentences[:batch_size])      # load and warm up
+
+    batched = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        vectors = np.concatenate([model.encode_queries(sentences[i:i + batch_size])
+                                  for i in range(0, len(sentences), batch_size)])
+        batched.append(time.perf_counter() - start)
+
+    single = []
+    for _ in range(repeat):
+        for q in queries:
+            start = time.perf_counter()
+            model.encode_query(q)
+            single.append(time.perf_counter() - start)
+
+    return normalize(vectors), normalize(model.encode_queries(queries)), {
+        "load_s": round(model.load_seconds or 0.0, 3),
+        "memory_mb": round(model.memory_footprint() / 2**20, 1),
+        "batched_sentences_per_s": round(len(sentences) / statistics.median(batched), 1),
+        "single_sentences_per_s": round(len(single) / sum(single), 1),
+        "single_p50_ms": round(percentile(single, 50) * 1000, 3),
+        "single_p95_ms": round(percentile(single, 95) * 1000, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend accuracy and throughput")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma separated, first is the baseline")
+    parser.add_argument("--threads", type=int, default=None, help="torch threads (EMBEDDING_THREADS)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--questions", default=os.path.join(MYBOT, "benchmarks", "questions.json"))
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    sentences = corpus_sentences(os.path.join(MYBOT, "data", "text_files"))
+    with open(args.questions, encoding="utf-8") as f:
+        queries = [q["question"] for q in json.load(f)]
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    report = {
+        "model": args.model,
+        "threads": args.threads,
+        "sentences": len(sentences),
+        "queries": len(queries),
+        "batch_size": args.batch_size,
+        "baseline": backends[0],
+        "backends": {}
+    }
+
+    baseline = None
+    for backend in backends:
+        model = EmbeddingModel(args.model, batch_wait_ms=0, backend=backend, threads=args.threads)
+        corpus, questions, result = measure(model, sentences, queries, args.batch_size, args.repeat)
+
+        if baseline is None:
+            baseline = (corpus, questions)
+        else:
+            drift = 1 - np.sum(np.concatenate([corpus, questions]) * np.concatenate(baseline), axis=1)
+            top = np.argsort(-(baseline[1] @ baseline[0].T), axis=1)[:, :args.k]
+            ours = np.argsort(-(questions @ corpus.T), axis=1)[:, :args.k]
+            result["cosine_drift"] = {
+                "mean": round(float(drift.mean()), 6),
+                "p99": round(float(percentile(drift.tolist(), 99)), 6),
+                "max": round(float(drift.max()), 6)
+            }
+            result[f"top{args.k}_agreement"] = round(
+                float(np.mean([len(set(a) & set(b)) / args.k for a, b in zip(top, ours)])), 3)
+
+        base = report["backends"].get(backends[0])
+        if base:
+            result["batched_speedup"] = round(result["batched_sentences_per_s"] / base["batched_sentences_per_s"], 2)
+            result["single_speedup"] = round(result["single_sentences_per_s"] / base["single_sentences_per_s"], 2)
+        report["backends"][backend] = result
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Recall and latency of dense, BM25 and hybrid (RRF) retrieval on the bundled corpus.
+
+    python benchmarks/bench_retrieval.py --k 3 --repeat 5
+
+Ingests data/ into a scratch vector store + BM25 index with the production
+loader, chunker and embedding model, then runs benchmarks/questions.json
+through each mode with the retrieval caches cleared before every query.
+A question counts as recalled when one of the top-k chunks comes from the
+expected file and contains the expected phrase. Prints a JSON report.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+MYBOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(MYBOT, "src"))
+
+from loader import DataLoader  # noqa: E402
+from chunker import Chunker  # noqa: E402
+from embedding import get_embedding_model  # noqa: E402
+from vectorstore import VectorStore  # noqa: E402
+from ingest import Ingestor  # noqa: E402
+from bm25 import BM25Index  # noqa: E402
+from retriever import Retriever  # noqa: E402
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def first_hit(docs, question):
+    """1-based rank of the first relevant chunk, or None"""
+    for rank, doc in enumerate(docs, start=1):
+        if (os.path.basename(str(doc["metadata"].get("source", ""))) == question["source"]
+                and question["expect"].lower() in doc["text"].lower()):
+            return rank
+    return None
+
+
+def run_mode(search, questions, repeat):
+    ranks, latencies = [], []
+    for i in range(repeat):
+        for q in questions:
+            start = time.perf_counter()
+            docs = search(q["question"])
+            latencies.append((time.perf_counter() - start) * 1000)
+            if i == 0:
+                ranks.append(first_hit(docs, q))
+
+    return {
+        "recall": round(sum(r is not None for r in ranks) / len(ranks), 3),
+        "mrr": round(sum(1 / r for r in ranks if r) / len(ranks), 3),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "misses": [q["question"] for q, r in zip(questions, ranks) if r is None]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense vs BM25 vs hybrid retrieval")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the questions for latency")
+    parser.add_argument("--questions", default=os.path.join(MYBOT, "benchmarks", "questions.json"))
+    parser.add_argument("--backend", default=None, help="vector backend (defaults to VECTOR_BACKEND)")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        embedder = get_embedding_model()
+        store = VectorStore(os.path.join(scratch, "vector_store"), backend=args.backend)
+        sparse = BM25Index(os.path.join(scratch, "vector_store", "bm25.npz"))
+        loader = DataLoader(os.path.join(MYBOT, "data", "pdf"), os.path.join(MYBOT, "data", "text_files"))
+        Ingestor(loader, Chunker(), embedder, store, sparse=sparse).sync()
+
+        dense = Retriever(store, embedder, k=args.k)
+        hybrid = Retriever(store, embedder, k=args.k, sparse=sparse)
+
+        def uncached(retriever):
+            def search(query):
+                retriever.embedding_cache.clear()
+                retriever.result_cache.clear()
+                return retriever.retrieve(query)
+            return search
+
+        def bm25(query):
+            return [{"text": t, "metadata": m} for _, t, m, _ in sparse.search(query, args.k)]
+
+        # Load the model before timing anything
+        embedder.encode_query("warm up")
+
+        report = {
+            "k": args.k,
+            "questions": len(questions),
+            "chunks": store.count(),
+            "modes": {
+                "dense": run_mode(uncached(dense), questions, args.repeat),
+                "bm25": run_mode(bm25, questions, args.repeat),
+                "hybrid": run_mode(uncached(hybrid), questions, args.repeat),
+            }
+        }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
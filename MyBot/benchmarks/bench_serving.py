@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Concurrent-user benchmark for /ask: threaded Flask server (main.py) vs the
+async ASGI server (asgi.py), both talking to the local stub upstream.
+
+    python benchmarks/bench_serving.py --users 200 --requests 600 --delay 1.5
+
+Each server runs in a scratch directory (fresh SQLite file, empty corpus) with
+the semantic cache and hedging disabled, so every request pays one upstream
+call. Prints a JSON report with throughput, latency percentiles and the peak
+OS thread count of the server process.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from stub_openrouter import serve
+
+MYBOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "threaded": lambda port: [
+        sys.executable, "-c",
+        f"import sys; sys.path.insert(0, {MYBOT!r}); import main; "
+        f"main.create_app().run(host='127.0.0.1', port={port}, threaded=True)"
+    ],
+    "async": lambda port: [
+        sys.executable, "-m", "uvicorn", "asgi:app", "--app-dir", MYBOT,
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+    ],
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else None
+
+
+def thread_count(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+async def wait_ready(url, timeout=300):
+    start = time.monotonic()
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() - start < timeout:
+            try:
+                if (await client.get(url + "/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+async def run_load(url, users, total, pid):
+    latencies, errors, peak_threads = [], 0, 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(f"what are the visiting hours for ward {i}")
+
+    async def user(client):
+        nonlocal errors
+        while not queue.empty():
+            question = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.post(url + "/ask", json={"question": question}, timeout=120)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while True:
+            peak_threads = max(peak_threads, thread_count(pid) or 0)
+            await asyncio.sleep(0.2)
+
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(limits=limits) as client:
+        sampler = asyncio.ensure_future(sample_threads())
+        start = time.perf_counter()
+        await asyncio.gather(*(user(client) for _ in range(users)))
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "peak_threads": peak_threads or None
+    }
+
+
+def bench(mode, port, args, stub_url):
+    env = {
+        **os.environ,
+        "OPENROUTER_API_KEY": "stub",
+        "OPENROUTER_BASE_URL": stub_url,
+        "OPENROUTER_POOL_SIZE": str(args.users),
+        "OPENROUTER_ASYNC_POOL_SIZE": str(args.users),
+        "SEMANTIC_CACHE_SIZE": "0",
+        "LLM_HEDGE_DELAY": "off",
+    }
+    with tempfile.TemporaryDirectory() as scratch:
+        proc = subprocess.Popen(SERVERS[mode](port), cwd=scratch, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            url = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_ready(url))
+            # Warm up lazy components (embedding model, connection pools)
+            asyncio.run(run_load(url, 4, 8, proc.pid))
+            return asyncio.run(run_load(url, args.users, args.requests, proc.pid))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Threaded vs async /ask throughput")
+    parser.add_argument("--users", type=int, default=200, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=600, help="total /ask calls per server")
+    parser.add_argument("--delay", type=float, default=1.5, help="stub upstream latency (s)")
+    parser.add_argument("--modes", nargs="+", default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    stub = serve(port=0, delay=args.delay, background=True)
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}/"
+
+    report = {"users": args.users, "upstream_delay_s": args.delay, "results": {}}
+    for i, mode in enumerate(args.modes):
+        report["results"][mode] = bench(mode, 5101 + i, args, stub_url)
+        print(f"{mode}: {report['results'][mode]}", file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
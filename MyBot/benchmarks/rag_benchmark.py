@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+End-to-end RAG pipeline benchmark, offline and deterministic.
+
+    python benchmarks/rag_benchmark.py --output bench.json
+    python benchmarks/rag_benchmark.py --baseline bench.json --fail-on-regression
+
+Runs DataLoader.load_all -> Chunker.split -> EmbeddingModel.encode ->
+VectorStore.add (corpus stages, --repeat times into fresh scratch stores),
+then embeds, searches, retrieves and answers every question in
+benchmarks/questions.json (--passes times) through MediBot.ask with the
+in-process StubClient in place of OpenRouter. Retrieval and answer caches
+are cleared before every query so each sample pays the full cost.
+
+Reports per-stage p50/p95/p99/mean latency and throughput, peak RSS,
+retrieval recall@k and MRR as JSON. With --baseline, adds the relative change
+of every stage's p50/p95 against a previous report and flags regressions
+beyond --tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MYBOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# chatbot.py imports src.llm, everything else uses the flat src/ modules
+sys.path.insert(0, MYBOT)
+sys.path.insert(0, os.path.join(MYBOT, "src"))
+
+# Sequential single-query timings should not include the micro-batch wait
+os.environ.setdefault("EMBEDDING_BATCH_WAIT_MS", "0")
+os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+os.environ.setdefault("SEMANTIC_CACHE_SIZE", "0")
+os.environ.setdefault("LLM_HEDGE_DELAY", "off")
+
+from loader import DataLoader  # noqa: E402
+from chunker import Chunker  # noqa: E402
+from embedding import get_embedding_model  # noqa: E402
+from vectorstore import VectorStore  # noqa: E402
+from retriever import Retriever  # noqa: E402
+from llm import ReasoningLLM  # noqa: E402
+from chatbot import MediBot  # noqa: E402
+
+from bench_retrieval import first_hit  # noqa: E402
+from stub_openrouter import StubClient  # noqa: E402
+
+
+class Stage:
+    """Latency samples of one pipeline stage plus the items they processed"""
+    def __init__(self, unit):
+        self.unit = unit
+        self.samples = []
+        self.items = 0
+
+    def time(self, fn, *args, items=1):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.samples.append(time.perf_counter() - start)
+        self.items += items
+        return result
+
+    def report(self):
+        ms = sorted(s * 1000 for s in self.samples)
+
+        def pct(q):
+            return round(ms[min(len(ms) - 1, int(q / 100 * len(ms)))], 3)
+
+        total = sum(self.samples)
+        return {
+            "samples": len(ms),
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "mean_ms": round(statistics.fmean(ms), 3),
+            "throughput": round(self.items / total, 2) if total else None,
+            "throughput_unit": self.unit
+        }
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=MYBOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def run(args, questions, scratch):
+    stages = {name: Stage(unit) for name, unit in [
+        ("load", "docs/s"), ("chunk", "chunks/s"), ("embed", "chunks/s"), ("store_add", "chunks/s"),
+        ("query_embed", "queries/s"), ("store_query", "queries/s"), ("retrieve", "queries/s"), ("ask", "queries/s")
+    ]}
+    rss = {}
+
+    loader = DataLoader(os.path.join(MYBOT, "data", "pdf"), os.path.join(MYBOT, "data", "text_files"))
+    chunker = Chunker()
+    embedder = get_embedding_model()
+    embedder.encode_query("warm up")
+
+    store = None
+    for i in range(args.repeat):
+        docs = stages["load"].time(loader.load_all, items=0)
+        stages["load"].items += len(docs)
+        chunks = stages["chunk"].time(chunker.split, docs, items=0)
+        stages["chunk"].items += len(chunks)
+        vectors = stages["embed"].time(embedder.encode, [c.page_content for c in chunks], items=len(chunks))
+        store = VectorStore(os.path.join(scratch, f"store{i}"), backend=args.backend)
+        stages["store_add"].time(store.add, chunks, vectors, items=len(chunks))
+    rss["after_ingest"] = peak_rss_mb()
+
+    retriever = Retriever(store, embedder, k=args.k)
+    bot = MediBot(retriever, ReasoningLLM(client=StubClient(args.llm_delay)))
+
+    def clear_caches():
+        retriever.embedding_cache.clear()
+        retriever.result_cache.clear()
+
+    ranks = []
+    for p in range(args.passes):
+        for q in questions:
+            qvec = stages["query_embed"].time(embedder.encode_query, q["question"])
+            stages["store_query"].time(store.query, qvec, args.k)
+            clear_caches()
+            found = stages["retrieve"].time(retriever.retrieve, q["question"])
+            if p == 0:
+                ranks.append(first_hit(found, q))
+            clear_caches()
+            stages["ask"].time(bot.ask, q["question"])
+    rss["after_queries"] = peak_rss_mb()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "embedding_model": embedder.name,
+            "vector_backend": type(store.backend).__name__,
+            "k": args.k,
+            "repeat": args.repeat,
+            "passes": args.passes,
+            "questions": len(questions),
+            "documents": len(docs),
+            "chunks": len(chunks),
+            "llm_delay_s": args.llm_delay
+        },
+        "stages": {name: stage.report() for name, stage in stages.items()},
+        "retrieval": {
+            f"recall_at_{args.k}": round(sum(r is not None for r in ranks) / len(ranks), 3),
+            "mrr": round(sum(1 / r for r in ranks if r) / len(ranks), 3),
+            "misses": [q["question"] for q, r in zip(questions, ranks) if r is None]
+        },
+        "peak_rss_mb": rss
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Relative p50/p95 change per stage; a stage regresses when either grows beyond tolerance"""
+    comparison = {"baseline_commit": baseline.get("meta", {}).get("commit"), "stages": {}, "regressions": []}
+    for name, stage in report["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old:
+            continue
+        entry = {}
+        for key in ("p50_ms", "p95_ms"):
+            if old.get(key):
+                entry[key.replace("_ms", "_change")] = round(stage[key] / old[key] - 1, 3)
+        entry["regression"] = any(v > tolerance for v in entry.values())
+        if entry["regression"]:
+            comparison["regressions"].append(name)
+        comparison["stages"][name] = entry
+
+    recall_key = f"recall_at_{report['meta']['k']}"
+    old_recall = baseline.get("retrieval", {}).get(recall_key)
+    if old_recall is not None:
+        delta = round(report["retrieval"][recall_key] - old_recall, 3)
+        comparison[f"{recall_key}_change"] = delta
+        if delta < 0:
+            comparison["regressions"].append(recall_key)
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage RAG pipeline benchmark")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3, help="runs of the corpus stages")
+    parser.add_argument("--passes", type=int, default=3, help="passes over the question set")
+    parser.add_argument("--questions", default=os.path.join(MYBOT, "benchmarks", "questions.json"))
+    parser.add_argument("--backend", default=None, help="vector backend (defaults to VECTOR_BACKEND)")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="simulated LLM latency per call (s)")
+    parser.add_argument("--output", help="write the JSON report here as well")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.questions, encoding="utf-8") as f:
+        questions = json.load(f)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        os.environ.setdefault("SEMANTIC_CACHE_PATH", os.path.join(scratch, "semantic_cache"))
+        report = run(args, questions, scratch)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.fail_on_regression and report.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenRouter chat completions endpoint, so the serving
+path can be exercised offline. Every request waits --delay seconds and then
+answers with a short sentence echoing the question (stream: true is supported).
+StubClient gives the same answers in-process for benchmarks that inject the client.
+
+    python benchmarks/stub_openrouter.py --port 8099 --delay 1.5
+    OPENROUTER_BASE_URL=http://127.0.0.1:8099/ python main.py
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def answer_for(body):
+    prompt = body["messages"][-1]["content"]
+    match = re.search(r"Question: (.*)", prompt)
+    question = match.group(1).strip() if match else "your question"
+    return f"About {question} please use the patient dashboard to reach the right hospital service."
+
+
+class StubClient:
+    """
+    In-process stand-in for OpenRouterClient (MultiLLM(client=StubClient())):
+    same deterministic answers as the HTTP stub, without sockets
+    """
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def post(self, body, deadline=None, stream=False):
+        if stream:
+            raise RuntimeError("StubClient does not stream; use the HTTP stub")
+        self.calls += 1
+        body = json.loads(body)
+        if self.delay:
+            time.sleep(self.delay)
+        return {
+            "model": body.get("model"),
+            "choices": [{"message": {"role": "assistant", "content": answer_for(body)}}]
+        }
+
+    def close(self):
+        pass
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    delay = 1.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(self.delay)
+        answer = answer_for(body)
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for word in answer.split(" "):
+                chunk = {"choices": [{"delta": {"content": word + " "}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+            return
+
+        payload = json.dumps({
+            "model": body.get("model"),
+            "choices": [{"message": {"role": "assistant", "content": answer}}]
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open hundreds of connections at once
+    request_queue_size = 1024
+
+
+def serve(port=8099, delay=1.0, background=False):
+    handler = type("Handler", (StubHandler,), {"delay": delay})
+    server = StubServer(("127.0.0.1", port), handler)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    print(f"Stub OpenRouter on http://127.0.0.1:{port}/ (delay {delay}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay", type=float, default=1.0)
+    args = parser.parse_args()
+    serve(args.port, args.delay)
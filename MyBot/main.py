@@ -6,9 +6,16 @@ Main entry point for the Flask application
 
 import os
 import sys
-from flask import Flask, request, jsonify
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, event, func, or_, select
+from sqlalchemy.orm import aliased
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -17,6 +24,7 @@ load_dotenv()
 
 # Add src to Python path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+import metrics
 
 # ============================================================
 # 🔥 FLASK APP CONFIGURATION
@@ -24,7 +32,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 app = Flask(__name__)
 
 # Enable CORS for HospiTex-UI
-CORS(app, origins=["http://localhost:5173", "http://localhost:3000"], supports_credentials=True)
+CORS_ORIGINS = ["http://localhost:5173", "http://localhost:3000"]
+CORS_EXPOSE_HEADERS = ["X-Next-Before", "X-Truncated", "ETag", "Server-Timing"]
+CORS(app, origins=CORS_ORIGINS, supports_credentials=True, expose_headers=CORS_EXPOSE_HEADERS)
 
 # Database configuration
 DB_FOLDER = os.path.join(os.getcwd(), "database")
@@ -35,10 +45,25 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 db = SQLAlchemy(app)
 
+# WAL lets readers run alongside the single writer; busy_timeout makes
+# concurrent writers wait for the lock instead of failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # In WAL mode NORMAL only fsyncs at checkpoints and stays corruption-safe
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
 # ============================================================
 # 📌 DATABASE MODELS
 # ============================================================
+# Index names must match migrations.py so existing databases converge on the same schema
 class Chat(db.Model):
+    __table_args__ = (db.Index("ix_chat_last_accessed", "last_accessed"),)
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), default="New Chat")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -46,6 +71,8 @@ class Chat(db.Model):
     messages = db.relationship('Message', backref='chat', lazy=True, cascade='all, delete-orphan')
 
 class Message(db.Model):
+    __table_args__ = (db.Index("ix_message_chat_id_timestamp", "chat_id", "timestamp"),)
+
     id = db.Column(db.Integer, primary_key=True)
     chat_id = db.Column(db.Integer, db.ForeignKey("chat.id"), nullable=False)
     role = db.Column(db.String(20))   # user / assistant
@@ -56,36 +83,27 @@ class Message(db.Model):
 # 🗄 INITIALIZE DATABASE
 # ============================================================
 def init_db():
-    """Initialize database with proper table creation"""
+    """Create missing tables, then apply pending schema migrations (see migrations.py)"""
+    from migrations import migrate
+
     with app.app_context():
+        event.listen(db.engine, "connect", configure_sqlite)
         try:
-            # Check if tables exist
             db.create_all()
-            
-            # Migrate existing data: set last_accessed to created_at for existing chats
-            chats = Chat.query.all()
-            for chat in chats:
-                if not chat.last_accessed:
-                    chat.last_accessed = chat.created_at
-            db.session.commit()
-            
-            print("✅ Database initialized with updated schema")
+            version = migrate(db.engine)
+            print(f"✅ Database initialized (schema version {version})")
         except Exception as e:
+            # Never drop tables here: refuse to start rather than lose chat history
             print(f"❌ Database initialization failed: {e}")
-            # If there's an error, drop and recreate
-            db.drop_all()
-            db.create_all()
-            print("✅ Database recreated with clean schema")
-
-# Initialize database
-init_db()
+            raise
 
 # ============================================================
 # 🧠 RAG SYSTEM INITIALIZATION
 # ============================================================
-def initialize_rag_system():
+def initialize_rag_system(llm=None):
     """
-    Initialize the RAG (Retrieval Augmented Generation) system
+    Initialize the RAG (Retrieval Augmented Generation) system.
+    Reuses the fallback bot's LLM when given one. Each step is timed in startup.
     """
     try:
         print("🚀 Initializing MediBot RAG System...")
@@ -93,8 +111,10 @@ def initialize_rag_system():
         # Import RAG modules
         from loader import DataLoader
         from chunker import Chunker
-        from embedding import EmbeddingModel
+        from embedding import get_embedding_model
         from vectorstore import VectorStore
+        from ingest import Ingestor
+        from bm25 import BM25Index
         from retriever import Retriever
         from llm import ReasoningLLM
         from chatbot import MediBot
@@ -104,28 +124,28 @@ def initialize_rag_system():
         os.makedirs("data/text_files", exist_ok=True)
         os.makedirs("data/vector_store", exist_ok=True)
         
-        # Load and process documents
-        docs = DataLoader().load_all()
-        if not docs:
+        embedder = get_embedding_model()
+        with startup.phase("embedding_model"):
+            embedder.warm_up()
+        with startup.phase("intents"):
+            llm = llm or ReasoningLLM()
+            llm.warm_up()
+        with startup.phase("vector_store"):
+            store = VectorStore()
+            # Keyword index for exact terms (test names, departments, policy numbers); RETRIEVER_HYBRID=0 disables
+            sparse = None
+            if os.getenv("RETRIEVER_HYBRID", "1") != "0":
+                sparse = BM25Index(os.path.join(store.path, "bm25.npz"))
+        # Sync the vector store with the data directories (only changed files are re-embedded)
+        with startup.phase("ingest"):
+            Ingestor(DataLoader(), Chunker(), embedder, store, sparse=sparse).sync()
+        if store.count() == 0:
             print("No documents found in data directories")
             return None
-            
-        chunker = Chunker()
-        chunks = chunker.split(docs)
-        if not chunks:
-            return None
-        
-        embedder = EmbeddingModel()
-        vectors = embedder.encode([c.page_content for c in chunks])
-        if vectors.size == 0:
-            return None
-        
-        store = VectorStore()
-        store.add(chunks, vectors)
-        
-        retriever = Retriever(store, embedder)
-        llm = ReasoningLLM()
-        bot = MediBot(retriever, llm)
+
+        with startup.phase("bot"):
+            retriever = Retriever(store, embedder, sparse=sparse)
+            bot = MediBot(retriever, llm)
         
         print("✅ MediBot RAG System Ready!")
         return bot
@@ -134,20 +154,179 @@ def initialize_rag_system():
         print(f"❌ RAG initialization failed: {e}")
         return None
 
-# Initialize the bot system
-try:
-    bot = initialize_rag_system()
-except Exception as e:
-    bot = None
-
-# Fallback to simple bot if RAG initialization fails
-if bot is None:
-    print("🔄 Using simple bot without RAG...")
+def initialize_simple_bot():
+    """Bot without retrieval (canned answers and the model chain only); None if unavailable"""
     try:
         from chatbot import SimpleMediBot
-        bot = SimpleMediBot()
+        return SimpleMediBot()
     except Exception as e:
-        bot = None
+        print(f"❌ Simple bot initialization failed: {e}")
+        return None
+
+# ============================================================
+# 🔥 STARTUP AND WARM-UP
+# ============================================================
+class Startup:
+    """
+    Startup state and per-phase timings. state goes starting -> warming ->
+    ready (RAG bot serving), degraded (simple bot only) or failed (no bot).
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.state = "starting"
+        self.phases = {}
+        self.total = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - start, 3)
+
+    @property
+    def finished(self):
+        return self.state in ("ready", "degraded", "failed")
+
+    def finish(self, state):
+        self.state = state
+        self.total = round(time.perf_counter() - self.started, 3)
+        breakdown = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        print(f"⏱️  Startup {state} after {self.total:.2f}s ({breakdown})")
+
+    def report(self):
+        return {
+            "state": self.state,
+            "phases_s": dict(self.phases),
+            "total_s": self.total,
+            "elapsed_s": round(time.perf_counter() - self.started, 3)
+        }
+
+startup = Startup()
+bot = None
+_app_created = False
+_app_lock = threading.Lock()
+
+def warm_up():
+    """Build the RAG bot and swap it in; requests are served by the simple bot meanwhile"""
+    global bot
+    startup.state = "warming"
+    try:
+        rag_bot = initialize_rag_system(llm=getattr(bot, "llm", None))
+    except Exception as e:
+        print(f"❌ RAG initialization failed: {e}")
+        rag_bot = None
+
+    if rag_bot is not None:
+        bot = rag_bot
+        startup.finish("ready")
+    else:
+        print("🔄 Using simple bot without RAG...")
+        startup.finish("degraded" if bot else "failed")
+
+def create_app(background=None):
+    """
+    Application factory: initializes the database and the simple bot inline
+    (fast), then warms up the RAG system in a background thread so the server
+    accepts requests right away. STARTUP_WARMUP=sync warms up before returning.
+    Safe to call more than once.
+
+    Entry points: python main.py, uvicorn asgi:app and gunicorn 'main:create_app()'
+    initialize at startup. Serving the module-level app directly (gunicorn
+    main:app, flask --app main run) initializes on the first request instead.
+    """
+    global bot, _app_created
+    if background is None:
+        background = os.getenv("STARTUP_WARMUP", "background") != "sync"
+
+    with _app_lock:
+        if _app_created:
+            return app
+
+        with startup.phase("database"):
+            init_db()
+        # Answers canned questions (and uses the model chain without context) until RAG is ready
+        with startup.phase("simple_bot"):
+            bot = initialize_simple_bot()
+        # Only now: concurrent first requests wait on the lock, and a failed init is retried
+        _app_created = True
+
+    if background:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    else:
+        warm_up()
+    return app
+
+@app.before_request
+def ensure_app_created():
+    """Servers that import main:app without calling create_app() initialize on the first request"""
+    if not _app_created:
+        # create_app() re-checks the flag under _app_lock
+        create_app()
+
+# ============================================================
+# 📈 METRICS AND TRACING
+# ============================================================
+def collect_component_metrics():
+    """Cache, embedding batcher and model circuit state, read at scrape time"""
+    from embedding import embedding_stats
+
+    caches = []
+    retriever = getattr(bot, "retriever", None)
+    if retriever is not None and hasattr(retriever, "cache_stats"):
+        caches += [(f"retrieval_{name}", stats) for name, stats in retriever.cache_stats().items()]
+    llm = getattr(bot, "llm", None)
+    if llm is not None and hasattr(llm, "answer_cache"):
+        caches.append(("semantic_answers", llm.answer_cache.stats()))
+
+    families = [
+        ("medibot_cache_hits", "counter", "Cache hits", [({"cache": n}, c["hits"]) for n, c in caches]),
+        ("medibot_cache_misses", "counter", "Cache misses", [({"cache": n}, c["misses"]) for n, c in caches]),
+        ("medibot_cache_hit_ratio", "gauge", "Cache hit ratio since start", [({"cache": n}, c["hit_ratio"]) for n, c in caches]),
+        ("medibot_cache_entries", "gauge", "Entries held per cache", [({"cache": n}, c["size"]) for n, c in caches]),
+    ]
+
+    batchers = [(m["model"], m["batcher"]) for m in embedding_stats() if m.get("batcher")]
+    families += [
+        ("medibot_embedding_batches", "counter", "Micro-batched encode calls", [({"model": n}, b["batches"]) for n, b in batchers]),
+        ("medibot_embedding_batch_items", "counter", "Texts encoded through the micro-batcher", [({"model": n}, b["items"]) for n, b in batchers]),
+        ("medibot_embedding_queue_depth", "gauge", "Texts waiting for the micro-batcher", [({"model": n}, b["queued"]) for n, b in batchers]),
+    ]
+
+    if llm is not None and hasattr(llm, "scoreboard"):
+        models = llm.scoreboard.snapshot()
+        families.append(("medibot_model_circuit_open", "gauge", "1 while a model is skipped after repeated failures",
+                         [({"model": m}, int(s["circuit"] == "open")) for m, s in models.items()]))
+
+    families += [
+        ("medibot_ready", "gauge", "1 once warm-up has finished and the RAG bot is serving",
+         [({}, int(startup.state == "ready"))]),
+        ("medibot_startup_phase_seconds", "gauge", "Duration of each startup phase",
+         [({"phase": name}, seconds) for name, seconds in startup.phases.items()]),
+    ]
+    return families
+
+metrics.REGISTRY.register_collector(collect_component_metrics)
+
+@app.before_request
+def start_request_trace():
+    g.trace, g.trace_token = metrics.start_trace(request.endpoint or "unmatched")
+
+@app.after_request
+def finish_request_trace(response):
+    trace = g.get("trace")
+    if trace is not None:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - trace.started,
+                                        endpoint=trace.name, status=response.status_code)
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+@app.teardown_request
+def end_request_trace(exc):
+    token = g.pop("trace_token", None)
+    if token is not None:
+        metrics.end_trace(token)
 
 # ============================================================
 # 🌍 FLASK ROUTES
@@ -174,21 +353,74 @@ def new_chat():
     except Exception as e:
         return jsonify({"error": f"Failed to create chat: {str(e)}"}), 500
 
+CHAT_PAGE_SIZE = 50
+MAX_CHAT_PAGE_SIZE = 200
+
+def chat_listing_query():
+    """
+    One statement for the chat list: first message (for the title), latest
+    message time and message count come from correlated subqueries. With
+    ix_chat_last_accessed SQLite walks chats in index order and evaluates them
+    only for the rows of the requested page
+    """
+    first_id = (select(Message.id).where(Message.chat_id == Chat.id)
+                .order_by(Message.timestamp.asc(), Message.id.asc()).limit(1)
+                .correlate(Chat).scalar_subquery())
+    last_time = (select(func.max(Message.timestamp)).where(Message.chat_id == Chat.id)
+                 .correlate(Chat).scalar_subquery())
+    count = (select(func.count(Message.id)).where(Message.chat_id == Chat.id)
+             .correlate(Chat).scalar_subquery())
+    first = aliased(Message)
+
+    return (db.session.query(
+                Chat,
+                first.role,
+                # 41 characters are enough to build the 40-character preview
+                func.substr(first.content, 1, 41),
+                last_time,
+                count)
+            .outerjoin(first, first.id == first_id)
+            .order_by(Chat.last_accessed.desc(), Chat.id.desc()))
+
+def parse_chat_cursor(cursor):
+    """Cursor format: '<last_accessed isoformat>_<chat id>'"""
+    accessed, chat_id = cursor.rsplit("_", 1)
+    return datetime.fromisoformat(accessed), int(chat_id)
+
 @app.route("/chat/list", methods=["GET"])
 def list_chats():
-    """Get list of all chat sessions"""
+    """
+    Get chat sessions, most recently accessed first.
+    All of them unless paged: ?limit= page size (default 50), ?before= cursor
+    from the X-Next-Before header. X-Truncated says whether more chats follow.
+    """
     try:
-        chats = Chat.query.order_by(Chat.last_accessed.desc()).all()
+        limit = None
+        if "limit" in request.args or "before" in request.args:
+            limit = min(max(request.args.get("limit", CHAT_PAGE_SIZE, type=int), 1), MAX_CHAT_PAGE_SIZE)
+        query = chat_listing_query()
+
+        before = request.args.get("before")
+        if before:
+            try:
+                accessed, chat_id = parse_chat_cursor(before)
+            except ValueError:
+                return jsonify({"error": "Invalid cursor"}), 400
+            query = query.filter(or_(
+                Chat.last_accessed < accessed,
+                and_(Chat.last_accessed == accessed, Chat.id < chat_id)
+            ))
+
+        rows = (query.limit(limit + 1) if limit else query).all()
+        truncated = limit is not None and len(rows) > limit
         chat_list = []
-        for chat in chats:
-            first_message = Message.query.filter_by(chat_id=chat.id).order_by(Message.timestamp.asc()).first()
+        for chat, first_role, preview, last_message_time, message_count in rows[:limit]:
             title = chat.title
-            if first_message and first_message.role == 'user':
-                title = first_message.content[:40] + ("..." if len(first_message.content) > 40 else "")
+            if first_role == 'user' and preview is not None:
+                title = preview[:40] + ("..." if len(preview) > 40 else "")
             
             # Use the most recent message timestamp for display
-            last_message = Message.query.filter_by(chat_id=chat.id).order_by(Message.timestamp.desc()).first()
-            display_time = chat.last_accessed if chat.last_accessed else (last_message.timestamp if last_message else chat.created_at)
+            display_time = chat.last_accessed if chat.last_accessed else (last_message_time or chat.created_at)
             
             chat_list.append({
                 "id": chat.id,
@@ -196,35 +428,108 @@ def list_chats():
                 "created_at": chat.created_at.isoformat(),
                 "last_accessed": chat.last_accessed.isoformat(),
                 "display_time": display_time.isoformat(),  # For frontend display
-                "message_count": Message.query.filter_by(chat_id=chat.id).count()
+                "message_count": message_count
             })
         
-        return jsonify(chat_list)
+        response = jsonify(chat_list)
+        response.headers["X-Truncated"] = "true" if truncated else "false"
+        if truncated:
+            last = rows[limit - 1][0]
+            response.headers["X-Next-Before"] = f"{last.last_accessed.isoformat()}_{last.id}"
+        return response
     except Exception as e:
         return jsonify({"error": f"Failed to load chats: {str(e)}"}), 500
 
+MESSAGE_PAGE_SIZE = 100
+MAX_MESSAGE_PAGE_SIZE = 500
+
+def serialize_message(m):
+    return {
+        "id": m.id,
+        "role": m.role, 
+        "content": m.content, 
+        "timestamp": m.timestamp.isoformat()
+    }
+
+def message_page(chat_id, args):
+    """
+    Keyset page of a chat's messages in (timestamp, id) order.
+    ?after_id= returns messages newer than that one (oldest first), otherwise
+    the newest page, optionally ending before ?before_id=. ?limit= caps the size
+    (default 100 once any of these is given; without them every message is returned).
+    Returns (messages, extra response fields, with "truncated" true when the page
+    left messages out); raises ValueError on a bad cursor.
+    """
+    limit = None
+    if any(name in args for name in ("limit", "after_id", "before_id")):
+        limit = min(max(args.get("limit", MESSAGE_PAGE_SIZE, type=int), 1), MAX_MESSAGE_PAGE_SIZE)
+    after_id = args.get("after_id", type=int)
+    before_id = args.get("before_id", type=int)
+    query = Message.query.filter_by(chat_id=chat_id)
+
+    def fetch(ordered):
+        # One row past the page tells whether there is more
+        return (ordered.limit(limit + 1) if limit else ordered).all()
+
+    def anchor(message_id):
+        m = Message.query.get(message_id)
+        if not m or m.chat_id != chat_id:
+            raise ValueError(f"Message {message_id} is not in chat {chat_id}")
+        return m
+
+    if after_id:
+        a = anchor(after_id)
+        rows = fetch(query.filter(or_(Message.timestamp > a.timestamp,
+                                      and_(Message.timestamp == a.timestamp, Message.id > a.id)))
+                     .order_by(Message.timestamp.asc(), Message.id.asc()))
+        more = limit is not None and len(rows) > limit
+        return rows[:limit], {"has_more_after": more, "truncated": more}
+
+    if before_id:
+        b = anchor(before_id)
+        query = query.filter(or_(Message.timestamp < b.timestamp,
+                                 and_(Message.timestamp == b.timestamp, Message.id < b.id)))
+    rows = fetch(query.order_by(Message.timestamp.desc(), Message.id.desc()))
+    more = limit is not None and len(rows) > limit
+    return list(reversed(rows[:limit])), {"has_more_before": more, "truncated": more}
+
+def chat_etag(chat, query_string):
+    """Validator for a chat page: changes whenever a message is added or removed or the title changes"""
+    count, last_id = (db.session.query(func.count(Message.id), func.max(Message.id))
+                      .filter(Message.chat_id == chat.id).one())
+    return hashlib.sha1(f"{chat.id}:{chat.title}:{count}:{last_id}:{query_string}".encode()).hexdigest()
+
 @app.route("/chat/<int:chat_id>", methods=["GET"])
 def load_chat(chat_id):
-    """Load messages from a specific chat"""
+    """
+    Load messages from a specific chat, all of them unless paged.
+    Paginate with ?before_id= / ?after_id= and ?limit=; send If-None-Match
+    with the previous ETag to get 304 when nothing changed.
+    """
     try:
         chat = Chat.query.get(chat_id)
         if not chat:
             return jsonify({"error": "Chat not found"}), 404
-        
-        msgs = Message.query.filter_by(chat_id=chat_id).order_by(Message.timestamp.asc()).all()
-        return jsonify({
+
+        etag = chat_etag(chat, request.query_string.decode())
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        try:
+            msgs, page = message_page(chat_id, request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        response = jsonify({
             "chat_id": chat_id,
             "title": chat.title,
-            "messages": [
-                {
-                    "id": m.id,
-                    "role": m.role, 
-                    "content": m.content, 
-                    "timestamp": m.timestamp.isoformat()
-                }
-                for m in msgs
-            ]
+            "messages": [serialize_message(m) for m in msgs],
+            **page
         })
+        response.set_etag(etag)
+        return response
     except Exception as e:
         return jsonify({"error": f"Failed to load chat: {str(e)}"}), 500
 
@@ -232,7 +537,8 @@ def load_chat(chat_id):
 def activate_chat(chat_id):
     """
     Unique API endpoint to activate/open a specific chat
-    Updates last_accessed timestamp and returns chat data
+    Updates last_accessed timestamp and returns the chat's messages
+    (same paging as load_chat, ?messages=0 to skip them entirely)
     """
     try:
         chat = Chat.query.get(chat_id)
@@ -240,27 +546,24 @@ def activate_chat(chat_id):
             return jsonify({"error": "Chat not found"}), 404
         
         # Update last accessed timestamp
-        chat.last_accessed = datetime.utcnow()
+        title = chat.title
+        last_accessed = datetime.utcnow()
+        chat.last_accessed = last_accessed
         db.session.commit()
         
-        # Get chat messages
-        msgs = Message.query.filter_by(chat_id=chat_id).order_by(Message.timestamp.asc()).all()
-        
-        return jsonify({
+        result = {
             "success": True,
             "chat_id": chat_id,
-            "title": chat.title,
-            "last_accessed": chat.last_accessed.isoformat(),
-            "messages": [
-                {
-                    "id": m.id,
-                    "role": m.role, 
-                    "content": m.content, 
-                    "timestamp": m.timestamp.isoformat()
-                }
-                for m in msgs
-            ]
-        })
+            "title": title,
+            "last_accessed": last_accessed.isoformat()
+        }
+        if request.args.get("messages", "1") != "0":
+            msgs, page = message_page(chat_id, request.args)
+            result.update(messages=[serialize_message(m) for m in msgs], **page)
+        
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to activate chat: {str(e)}"}), 500
 
@@ -284,56 +587,86 @@ def delete_chat(chat_id):
         db.session.rollback()
         return jsonify({"error": f"Failed to delete chat: {str(e)}"}), 500
 
+def existing_chat_id(chat_id):
+    """
+    Id of the chat a question belongs to (None if it does not exist), checked
+    before the slow LLM call without holding a connection during it
+    """
+    chat = Chat.query.get(chat_id) if chat_id else None
+    db.session.close()
+    return chat.id if chat else None
+
+def create_chat():
+    chat = Chat()
+    db.session.add(chat)
+    db.session.commit()
+    return chat
+
+@metrics.span("db_write")
+def record_exchange(chat_id, question, answer, asked_at):
+    """
+    Write the question, the answer and the chat title/last_accessed update in
+    one transaction (a single commit). Creates the chat when chat_id is None.
+    Returns the chat id, or None without writing anything if the chat was
+    deleted while the answer was generated.
+    """
+    if chat_id is None:
+        chat = Chat(created_at=asked_at)
+        db.session.add(chat)
+        db.session.flush()
+    else:
+        # Fetched again in this session: the chat may have been deleted during the LLM call
+        chat = Chat.query.get(chat_id)
+        if chat is None:
+            db.session.rollback()
+            return None
+
+    answered_at = datetime.utcnow()
+    db.session.add_all([
+        Message(chat_id=chat.id, role="user", content=question, timestamp=asked_at),
+        Message(chat_id=chat.id, role="assistant", content=answer, timestamp=answered_at)
+    ])
+
+    if chat.title == "New Chat" or not chat.title:
+        chat.title = question[:40] + ("..." if len(question) > 40 else "")
+    chat.last_accessed = answered_at
+
+    db.session.commit()
+    return chat.id
+
+def parse_question():
+    """Validate an /ask payload. Returns (question, chat_id, error_response)"""
+    data = request.json
+    if not data:
+        return None, None, (jsonify({"error": "No JSON data provided"}), 400)
+
+    question = data.get("question", "").strip()
+    if not question:
+        return None, None, (jsonify({"error": "Empty question"}), 400)
+
+    if not bot:
+        return None, None, (jsonify({"error": "Chatbot system is not available."}), 503)
+
+    return question, data.get("chat_id"), None
+
 @app.route("/ask", methods=["POST"])
 def ask():
     """Ask MediBot a question"""
     try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "No JSON data provided"}), 400
-            
-        question = data.get("question", "").strip()
-        chat_id = data.get("chat_id")
+        question, chat_id, error = parse_question()
+        if error:
+            return error
 
-        if not question:
-            return jsonify({"error": "Empty question"}), 400
+        asked_at = datetime.utcnow()
+        chat_id = existing_chat_id(chat_id)
 
-        if not bot:
-            return jsonify({"error": "Chatbot system is not available."}), 503
-
-        # Create chat if missing
-        if not chat_id:
-            chat = Chat()
-            db.session.add(chat)
-            db.session.commit()
-            chat_id = chat.id
-        else:
-            chat = Chat.query.get(chat_id)
-            if not chat:
-                chat = Chat()
-                db.session.add(chat)
-                db.session.commit()
-                chat_id = chat.id
-
-        # Save user message
-        user_msg = Message(chat_id=chat_id, role="user", content=question)
-        db.session.add(user_msg)
-        db.session.commit()
-
-        # Generate response
+        # Generate response (no database connection held meanwhile)
         answer = bot.ask(question)
 
-        # Save assistant message
-        bot_msg = Message(chat_id=chat_id, role="assistant", content=answer)
-        db.session.add(bot_msg)
-
-        # Update chat title and last accessed
-        chat = Chat.query.get(chat_id)
-        if chat and (chat.title == "New Chat" or not chat.title):
-            chat.title = question[:40] + ("..." if len(question) > 40 else "")
-        chat.last_accessed = datetime.utcnow()
-
-        db.session.commit()
+        # Save both messages and the chat update in one transaction
+        chat_id = record_exchange(chat_id, question, answer, asked_at)
+        if chat_id is None:
+            return jsonify({"error": "Chat not found"}), 404
 
         return jsonify({
             "answer": answer, 
@@ -345,23 +678,149 @@ def ask():
         db.session.rollback()
         return jsonify({"error": "Internal server error"}), 500
 
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/ask/stream", methods=["POST"])
+def ask_stream():
+    """
+    Ask MediBot a question and stream the answer as Server-Sent Events:
+    chat, token (incremental text), reset (discard streamed text), done (final answer)
+    """
+    try:
+        question, chat_id, error = parse_question()
+        if error:
+            return error
+
+        asked_at = datetime.utcnow()
+        # The first event carries the chat id, so a new chat is created up front
+        chat_id = existing_chat_id(chat_id) or create_chat().id
+        db.session.close()
+    except Exception as e:
+        print(f"Error in ask stream endpoint: {e}")
+        db.session.rollback()
+        return jsonify({"error": "Internal server error"}), 500
+
+    def generate():
+        yield sse("chat", {"chat_id": chat_id})
+        answer = None
+        try:
+            for event in bot.ask_stream(question):
+                if event["type"] == "done":
+                    answer = event["answer"]
+                yield sse(event["type"], event)
+        except Exception as e:
+            print(f"Error while streaming answer: {e}")
+            answer = "Unable to answer right now. Please try again."
+            yield sse("done", {"type": "done", "answer": answer, "model": None})
+
+        # Persist the exchange once the stream has finished
+        try:
+            if record_exchange(chat_id, question, answer, asked_at) is None:
+                print(f"Chat {chat_id} was deleted during streaming, answer not saved")
+        except Exception as e:
+            print(f"Error saving streamed answer: {e}")
+            db.session.rollback()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+BATCH_MAX_QUESTIONS = int(os.getenv("ASK_BATCH_MAX_QUESTIONS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("ASK_BATCH_MAX_CONCURRENCY", "16"))
+
+@app.route("/ask/batch", methods=["POST"])
+def ask_batch():
+    """
+    Answer a list of questions for offline jobs (FAQ regeneration, regression
+    checks, cache warming). Nothing is saved to chats. Body:
+    {"questions": [...], "concurrency": n}; results come back in input order
+    with per-item timings.
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+
+        questions = data.get("questions")
+        if not isinstance(questions, list) or not questions:
+            return jsonify({"error": "questions must be a non-empty list"}), 400
+        if len(questions) > BATCH_MAX_QUESTIONS:
+            return jsonify({"error": f"At most {BATCH_MAX_QUESTIONS} questions per batch"}), 400
+        if not all(isinstance(q, str) for q in questions):
+            return jsonify({"error": "questions must be strings"}), 400
+
+        if not bot:
+            return jsonify({"error": "Chatbot system is not available."}), 503
+
+        concurrency = data.get("concurrency")
+        if concurrency is not None:
+            concurrency = min(max(int(concurrency), 1), BATCH_MAX_CONCURRENCY)
+
+        batch = bot.ask_many(questions, concurrency=concurrency)
+        return jsonify({"count": len(batch["results"]), **batch})
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency must be an integer"}), 400
+    except Exception as e:
+        print(f"Error in ask batch endpoint: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route("/health", methods=["GET"])
 def health_check():
-    """Health check endpoint"""
+    """Liveness: the process is up and serving requests (no dependencies checked)"""
+    report = {"status": "alive", "startup": startup.report()}
+    llm = getattr(bot, "llm", None)
+    if llm is not None and hasattr(llm, "scoreboard"):
+        # Per-model circuit state, in memory
+        report["models"] = llm.scoreboard.snapshot()
+    return jsonify(report)
+
+@app.route("/ready", methods=["GET"])
+def readiness_check():
+    """
+    Readiness: warm-up has finished and the database answers. 503 while warming
+    up or when no bot could be started; "degraded" means answers come without RAG.
+    """
     try:
+        from embedding import embedding_stats
+
         chat_count = Chat.query.count()
         message_count = Message.query.count()
-        
-        status = {
-            "status": "healthy" if bot else "degraded",
-            "rag_initialized": bot is not None,
+
+        if not startup.finished:
+            status = "warming"
+        elif startup.state == "ready":
+            status = "healthy"
+        else:
+            status = "degraded" if bot else "unavailable"
+
+        report = {
+            "status": status,
+            "rag_initialized": startup.state == "ready",
+            "startup": startup.report(),
             "database": "connected",
             "chats_count": chat_count,
-            "messages_count": message_count
+            "messages_count": message_count,
+            "embedding_models": embedding_stats()
         }
-        return jsonify(status)
+        retriever = getattr(bot, "retriever", None)
+        if retriever is not None and hasattr(retriever, "cache_stats"):
+            report["retrieval_cache"] = retriever.cache_stats()
+        llm = getattr(bot, "llm", None)
+        if llm is not None and hasattr(llm, "answer_cache"):
+            report["answer_cache"] = llm.answer_cache.stats()
+        if llm is not None and hasattr(llm, "scoreboard"):
+            report["models"] = llm.scoreboard.snapshot()
+        return jsonify(report), 200 if status in ("healthy", "degraded") else 503
     except Exception as e:
-        return jsonify({"status": "unhealthy", "error": str(e)}), 500
+        return jsonify({"status": "unhealthy", "error": str(e)}), 503
 
 # ============================================================
 # 🚀 APPLICATION STARTUP
@@ -369,4 +828,5 @@ def health_check():
 if __name__ == "__main__":
     print("🏥 MediBot - AI Hospital Management Assistant")
     print("🔥 Server running at http://127.0.0.1:5001")
+    create_app()
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
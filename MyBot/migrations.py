@@ -0,0 +1,54 @@
+"""
+MediBot - versioned schema migrations for the SQLite chat database
+
+The applied schema version lives in PRAGMA user_version. Each migration runs
+once, in order, and bumps the version when it succeeds. Migrations must be
+idempotent (IF NOT EXISTS, guarded UPDATEs): SQLite commits DDL immediately,
+so a migration interrupted half-way is simply run again on the next start.
+"""
+
+from sqlalchemy import text
+
+
+def backfill_last_accessed(conn):
+    conn.execute(text("UPDATE chat SET last_accessed = created_at WHERE last_accessed IS NULL"))
+
+
+def add_chat_indexes(conn):
+    # Every per-chat message query filters by chat_id and orders by timestamp
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_message_chat_id_timestamp ON message (chat_id, timestamp)"
+    ))
+    # /chat/list orders by last_accessed (the rowid makes it (last_accessed, id))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_chat_last_accessed ON chat (last_accessed)"
+    ))
+
+
+MIGRATIONS = [
+    (1, "backfill chat.last_accessed", backfill_last_accessed),
+    (2, "index message(chat_id, timestamp) and chat(last_accessed)", add_chat_indexes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def migrate(engine):
+    """Apply every pending migration. Returns the resulting schema version."""
+    with engine.connect() as conn:
+        version = schema_version(conn)
+
+    for number, name, apply in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            apply(conn)
+            conn.execute(text(f"PRAGMA user_version = {number}"))
+        version = number
+        print(f"✅ Applied migration {number}: {name}")
+
+    return version
@@ -0,0 +1,113 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+import metrics
+from metrics import BATCH_SIZE_BUCKETS
+
+
+class _Request:
+    __slots__ = ("text", "future", "enqueued")
+
+    def __init__(self, text):
+        self.text = text
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batcher for single-text encode calls from concurrent requests.
+    The worker waits up to max_wait_ms after the first queued text (or until
+    max_batch texts are queued), runs one batched forward pass through encode_fn
+    and hands each caller its own row. Queue waits and batch sizes also go to
+    the /metrics histograms, labelled with name.
+    """
+    def __init__(self, encode_fn, max_batch=32, max_wait_ms=5.0, name="default"):
+        self.encode_fn = encode_fn
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.batch_size_counts = {b: 0 for b in BATCH_SIZE_BUCKETS}
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, text) -> Future:
+        self._ensure_worker()
+        request = _Request(text)
+        self._queue.put(request)
+        return request.future
+
+    def encode(self, texts):
+        """Encode texts through the shared batch queue; blocks until all rows are back"""
+        futures = [self.submit(t) for t in texts]
+        return np.stack([f.result() for f in futures])
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        flush_at = batch[0].enqueued + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = flush_at - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            try:
+                vectors = self.encode_fn([r.text for r in batch])
+                if len(vectors) != len(batch):
+                    raise RuntimeError(f"encoder returned {len(vectors)} rows for {len(batch)} texts")
+                for request, vector in zip(batch, vectors):
+                    request.future.set_result(vector)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+            self._record(batch, started)
+
+    def _record(self, batch, started):
+        waits = [started - r.enqueued for r in batch]
+        bucket = next((b for b in BATCH_SIZE_BUCKETS if len(batch) <= b), BATCH_SIZE_BUCKETS[-1])
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.total_wait += sum(waits)
+            self.max_wait_seen = max(self.max_wait_seen, max(waits))
+            self.batch_size_counts[bucket] += 1
+        for wait in waits:
+            metrics.EMBEDDING_QUEUE_WAIT_SECONDS.observe(wait, model=self.name)
+        metrics.EMBEDDING_BATCH_SIZE.observe(len(batch), model=self.name)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "batch_size_le": {str(b): n for b, n in self.batch_size_counts.items()},
+                "avg_queue_wait_ms": round(1000 * self.total_wait / self.items, 3) if self.items else 0.0,
+                "max_queue_wait_ms": round(1000 * self.max_wait_seen, 3),
+                "queued": self._queue.qsize()
+            }
@@ -0,0 +1,219 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from array import array
+import numpy as np
+
+INDEX_VERSION = 1
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it me my of on or
+the their there these this to what when where which who will with you your
+""".split())
+
+
+def _array(typecode, values):
+    out = array(typecode)
+    out.frombytes(values.tobytes())
+    return out
+
+
+def tokenize(text: str):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over the ingested chunks.
+
+    Each term owns two growable arrays (doc rows, term frequencies), so adding
+    a chunk only appends to the postings of its terms. Deleted chunks are
+    tombstoned and dropped when the index is saved. On disk the postings are
+    stored CSR-style (one offsets array, one rows array, one tf array) in a
+    single .npz file next to the vector store.
+    """
+    def __init__(self, path="data/vector_store/bm25.npz", k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        # numpy views of the postings must not be alive while the arrays grow
+        self._lock = threading.RLock()
+        self.reload()
+
+    def reload(self):
+        """(Re)read the index from disk, e.g. after another process saved it"""
+        with self._lock:
+            self._clear()
+            if self.path and os.path.exists(self.path):
+                try:
+                    self._load()
+                except Exception as e:
+                    print(f"⚠️  Ignoring unreadable BM25 index: {e}")
+                    self._clear()
+
+    def _clear(self):
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.row_of = {}
+        self.doc_len = array("I")
+        self.live = bytearray()
+        self.terms = {}
+        self.postings = []          # term id -> (array rows, array tfs)
+        self.total_len = 0
+
+    def count(self):
+        return len(self.row_of)
+
+    # Updates
+
+    def upsert(self, ids, documents, metadatas):
+        with self._lock:
+            self._upsert(ids, documents, metadatas)
+
+    def _upsert(self, ids, documents, metadatas):
+        self.delete(ids)
+        for cid, text, meta in zip(ids, documents, metadatas):
+            row = len(self.ids)
+            self.ids.append(cid)
+            self.documents.append(text)
+            self.metadatas.append(meta)
+            self.row_of[cid] = row
+            self.live.append(1)
+
+            freqs = {}
+            tokens = tokenize(text)
+            for t in tokens:
+                freqs[t] = freqs.get(t, 0) + 1
+            self.doc_len.append(len(tokens))
+            self.total_len += len(tokens)
+
+            for term, tf in freqs.items():
+                tid = self.terms.get(term)
+                if tid is None:
+                    tid = self.terms[term] = len(self.postings)
+                    self.postings.append((array("I"), array("H")))
+                rows, tfs = self.postings[tid]
+                rows.append(row)
+                tfs.append(min(tf, 0xFFFF))
+
+    def delete(self, ids):
+        with self._lock:
+            for cid in ids:
+                row = self.row_of.pop(cid, None)
+                if row is not None:
+                    self.live[row] = 0
+                    self.total_len -= self.doc_len[row]
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    # Search
+
+    def search(self, query: str, k=10):
+        """Top-k live chunks for the query as [(id, document, metadata, score)]"""
+        with self._lock:
+            return self._search(query, k)
+
+    def _search(self, query, k):
+        n = self.count()
+        if n == 0:
+            return []
+
+        avgdl = self.total_len / n if self.total_len else 1.0
+        doc_len = np.frombuffer(self.doc_len, dtype=np.uint32)
+        live = np.frombuffer(self.live, dtype=np.uint8).astype(bool)
+        scores = np.zeros(len(doc_len), dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            tid = self.terms.get(term)
+            if tid is None:
+                continue
+            rows = np.frombuffer(self.postings[tid][0], dtype=np.uint32)
+            tfs = np.frombuffer(self.postings[tid][1], dtype=np.uint16).astype(np.float32)
+            df = int(live[rows].sum())
+            if df == 0:
+                continue
+            idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * doc_len[rows] / avgdl)
+            # Rows are unique within a posting list, so plain fancy-index add is safe
+            scores[rows] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+        scores[~live] = 0.0
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) == 0:
+            return []
+        top = hits[np.argsort(-scores[hits])[:k]]
+        return [(self.ids[r], self.documents[r], self.metadatas[r], float(scores[r])) for r in top]
+
+    # Persistence
+
+    def save(self):
+        """Write a compacted copy (tombstoned rows removed) and swap it in atomically"""
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        live_rows = [r for r in range(len(self.ids)) if self.live[r]]
+        remap = np.full(len(self.ids), -1, dtype=np.int64)
+        remap[live_rows] = np.arange(len(live_rows))
+
+        terms, offsets, all_rows, all_tfs = [], [0], [], []
+        for term, tid in self.terms.items():
+            rows = np.frombuffer(self.postings[tid][0], dtype=np.uint32)
+            tfs = np.frombuffer(self.postings[tid][1], dtype=np.uint16)
+            keep = remap[rows] >= 0
+            if not keep.any():
+                continue
+            terms.append(term)
+            all_rows.append(remap[rows[keep]].astype(np.uint32))
+            all_tfs.append(tfs[keep])
+            offsets.append(offsets[-1] + int(keep.sum()))
+
+        meta = {
+            "version": INDEX_VERSION,
+            "terms": terms,
+            "ids": [self.ids[r] for r in live_rows],
+            "documents": [self.documents[r] for r in live_rows],
+            "metadatas": [self.metadatas[r] for r in live_rows]
+        }
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Unique name: several worker processes may save at once
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+                doc_len=np.frombuffer(self.doc_len, dtype=np.uint32)[live_rows],
+                offsets=np.array(offsets, dtype=np.int64),
+                rows=np.concatenate(all_rows) if all_rows else np.zeros(0, dtype=np.uint32),
+                tfs=np.concatenate(all_tfs) if all_tfs else np.zeros(0, dtype=np.uint16)
+            )
+        os.replace(tmp, self.path)
+        self._load()
+
+    def _load(self):
+        with np.load(self.path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            if meta.get("version") != INDEX_VERSION:
+                raise ValueError(f"unsupported BM25 index version {meta.get('version')}")
+            doc_len, offsets, rows, tfs = data["doc_len"], data["offsets"], data["rows"], data["tfs"]
+
+        self._clear()
+        self.ids = meta["ids"]
+        self.documents = meta["documents"]
+        self.metadatas = meta["metadatas"]
+        self.row_of = {cid: row for row, cid in enumerate(self.ids)}
+        self.doc_len = _array("I", doc_len.astype(np.uint32))
+        self.live = bytearray(b"\x01" * len(self.ids))
+        self.total_len = int(doc_len.sum())
+        for tid, term in enumerate(meta["terms"]):
+            start, end = offsets[tid], offsets[tid + 1]
+            self.terms[term] = tid
+            self.postings.append((_array("I", rows[start:end]), _array("H", tfs[start:end])))
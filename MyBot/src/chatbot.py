@@ -1,10 +1,50 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from src.llm import ReasoningLLM
+from context import ContextPacker
+import metrics
 from typing import List
 
+
+def _batch_concurrency(concurrency):
+    return max(1, concurrency or int(os.getenv("ASK_BATCH_CONCURRENCY", "4")))
+
+
+def _answer_all(answer, questions, contexts, concurrency, started):
+    """
+    Run answer(question, context) over a batch with at most `concurrency`
+    calls in flight. Returns one result dict per question, in input order.
+    """
+    def run(item):
+        question, context = item
+        start = time.monotonic()
+        result = {"question": question, "answer": None, "error": None}
+        try:
+            result["answer"] = answer(question, context)
+        except Exception as e:
+            print(f"LLM ERROR: {e}")
+            result["error"] = str(e)
+            result["answer"] = "Unable to answer right now. Please try again."
+        end = time.monotonic()
+        result["timings"] = {
+            "queued_ms": round((start - started) * 1000, 1),
+            "llm_ms": round((end - start) * 1000, 1),
+            "total_ms": round((end - started) * 1000, 1)
+        }
+        return result
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ask-batch") as pool:
+        futures = [metrics.submit(pool, run, item) for item in zip(questions, contexts)]
+        return [f.result() for f in futures]
+
+
 class MediBot:
-    def __init__(self, retriever=None, llm=None):
+    def __init__(self, retriever=None, llm=None, packer=None):
         self.retriever = retriever
         self.llm = llm or ReasoningLLM()
+        self.packer = packer or ContextPacker()
         print("🤖 MediBot ready!\n")
 
     def get_context(self, query: str) -> str:
@@ -15,14 +55,34 @@ class MediBot:
             return ""
         
         try:
-            docs = self.retriever.retrieve(query)
-            if not docs:
-                return "NO CONTEXT FOUND"
-            return "\n\n".join(d["text"] for d in docs)
+            with metrics.span("retrieve"):
+                return self._format_context(self.retriever.retrieve(query))
         except Exception as e:
             print(f"Retriever error: {e}")
             return "NO CONTEXT FOUND"
 
+    def _format_context(self, docs):
+        """
+        Merge overlapping chunks, drop repeated sentences and fit the token budget
+        """
+        if not docs:
+            return "NO CONTEXT FOUND"
+        with metrics.span("context_pack"):
+            return self.packer.pack(docs) or "NO CONTEXT FOUND"
+
+    def get_contexts(self, queries):
+        """
+        Contexts for a batch of queries from one retrieve_many() pass
+        """
+        if not self.retriever:
+            return [""] * len(queries)
+        try:
+            with metrics.span("retrieve_many"):
+                return [self._format_context(docs) for docs in self.retriever.retrieve_many(queries)]
+        except Exception as e:
+            print(f"Retriever error: {e}")
+            return ["NO CONTEXT FOUND"] * len(queries)
+
     def ask(self, query: str) -> str:
         """
         Get concise response from the bot
@@ -43,6 +103,67 @@ class MediBot:
             print(f"LLM ERROR: {e}")
             return "Unable to answer right now. Please try again."
 
+    def ask_many(self, queries, concurrency=None):
+        """
+        Answer a batch of questions (offline jobs, cache warming). Retrieval is
+        one vectorized pass for the whole batch; LLM calls run with bounded
+        concurrency. Returns {"results": [...], "timings": {...}} with results
+        in input order, each carrying its own queued/llm/total timings.
+        """
+        started = time.monotonic()
+        questions = [(q or "").strip() for q in queries]
+        contexts = self.get_contexts(questions)
+        retrieved = time.monotonic()
+
+        def answer(question, context):
+            if not question:
+                return "Please ask a question about hospital services, appointments, or medical assistance."
+            return self.llm.ask(question, context)
+
+        results = _answer_all(answer, questions, contexts, _batch_concurrency(concurrency), retrieved)
+        return {
+            "results": results,
+            "timings": {
+                "retrieve_ms": round((retrieved - started) * 1000, 1),
+                "total_ms": round((time.monotonic() - started) * 1000, 1)
+            }
+        }
+
+    async def ask_async(self, query: str) -> str:
+        """
+        Async ask for the ASGI server: retrieval runs in a worker thread,
+        the LLM call is awaited on the event loop
+        """
+        if not query or not query.strip():
+            return "Please ask a question about hospital services, appointments, or medical assistance."
+
+        query = query.strip()
+        context = await asyncio.to_thread(self.get_context, query)
+
+        try:
+            return await self.llm.ask_async(query, context)
+        except Exception as e:
+            print(f"LLM ERROR: {e}")
+            return "Unable to answer right now. Please try again."
+
+    def ask_stream(self, query: str):
+        """
+        Stream the response as events from the LLM (see MultiLLM.ask_stream)
+        """
+        if not query or not query.strip():
+            yield {"type": "done", "model": None,
+                   "answer": "Please ask a question about hospital services, appointments, or medical assistance."}
+            return
+
+        query = query.strip()
+        context = self.get_context(query)
+
+        try:
+            yield from self.llm.ask_stream(query, context)
+        except Exception as e:
+            print(f"LLM ERROR: {e}")
+            yield {"type": "done", "model": None, "answer": "Unable to answer right now. Please try again."}
+
     def chat(self):
         """
         Interactive chat mode in terminal
@@ -91,6 +212,36 @@ class SimpleMediBot:
             print(f"LLM ERROR: {e}")
             return "Unable to answer right now. Please try again later."
     
+    def ask_many(self, queries, concurrency=None):
+        """
+        Batch ask without context retrieval (see MediBot.ask_many)
+        """
+        started = time.monotonic()
+        questions = [(q or "").strip() for q in queries]
+        results = _answer_all(self.llm.ask, questions, [""] * len(questions),
+                              _batch_concurrency(concurrency), started)
+        return {
+            "results": results,
+            "timings": {"retrieve_ms": 0.0, "total_ms": round((time.monotonic() - started) * 1000, 1)}
+        }
+
+    async def ask_async(self, query: str) -> str:
+        try:
+            return await self.llm.ask_async(query, "")
+        except Exception as e:
+            print(f"LLM ERROR: {e}")
+            return "Unable to answer right now. Please try again later."
+
+    def ask_stream(self, query: str):
+        """
+        Stream without context retrieval
+        """
+        try:
+            yield from self.llm.ask_stream(query, "")
+        except Exception as e:
+            print(f"LLM ERROR: {e}")
+            yield {"type": "done", "model": None, "answer": "Unable to answer right now. Please try again later."}
+
     def chat(self):
         """
         Interactive chat for simple bot
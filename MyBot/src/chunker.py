@@ -2,6 +2,8 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 class Chunker:
     def __init__(self, size=300, overlap=100):
+        self.size = size
+        self.overlap = overlap
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=size,
             chunk_overlap=overlap,
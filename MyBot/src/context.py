@@ -0,0 +1,132 @@
+"""
+Context assembly between retrieval and the prompt.
+
+The chunker cuts with a 100 character overlap, so the top-k chunks often
+repeat each other. ContextPacker stitches overlapping chunks of the same
+source back together, drops sentences that (nearly) repeat one already
+kept, and packs what is left, best-ranked first, into a token budget.
+"""
+
+import math
+import os
+import re
+
+import metrics
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+CONTEXT_TOKENS = metrics.REGISTRY.counter(
+    "medibot_context_tokens", "Estimated context tokens before (retrieved) and after (packed) packing", ["stage"])
+CONTEXT_TOKENS_SAVED = metrics.REGISTRY.counter(
+    "medibot_context_tokens_saved", "Estimated prompt tokens removed by context packing")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English BPE vocabularies)"""
+    return math.ceil(len(text) / 4)
+
+
+def overlap(left: str, right: str, minimum: int) -> int:
+    """Length of the longest suffix of left that is a prefix of right (0 if shorter than minimum)"""
+    if len(left) < minimum or len(right) < minimum:
+        return 0
+    head = right[:minimum]
+    start = max(0, len(left) - len(right))
+    while True:
+        pos = left.find(head, start)
+        if pos < 0:
+            return 0
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        start = pos + 1
+
+
+class ContextPacker:
+    """
+    Turns retrieved chunks ({"text", "metadata"} dicts, best first) into one
+    context string of at most `budget` estimated tokens (budget <= 0: no limit).
+    Sentences whose word sets overlap a kept sentence by `similarity` (Jaccard)
+    or more are dropped.
+    """
+    def __init__(self, budget=None, similarity=None, min_overlap=20):
+        self.budget = budget if budget is not None else int(os.getenv("CONTEXT_TOKEN_BUDGET", "512"))
+        self.similarity = similarity or float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.85"))
+        self.min_overlap = min_overlap
+
+    def merge(self, docs):
+        """Stitch chunks of the same source/page that overlap or contain each other"""
+        segments = []      # [key, text], in rank order of their best chunk
+        for doc in docs:
+            text = (doc.get("text") or "").strip()
+            if not text:
+                continue
+            meta = doc.get("metadata") or {}
+            key = (meta.get("source"), meta.get("page"))
+            for segment in segments:
+                if segment[0] != key:
+                    continue
+                current = segment[1]
+                if text in current:
+                    break
+                if current in text:
+                    segment[1] = text
+                    break
+                n = overlap(current, text, self.min_overlap)
+                if n:
+                    segment[1] = current + text[n:]
+                    break
+                n = overlap(text, current, self.min_overlap)
+                if n:
+                    segment[1] = text + current[n:]
+                    break
+            else:
+                segments.append([key, text])
+        return [text for _, text in segments]
+
+    def pack(self, docs) -> str:
+        raw = sum(estimate_tokens(d.get("text") or "") for d in docs)
+        kept_words = []
+        seen = set()
+        used = 0
+        parts = []
+        full = False
+
+        for segment in self.merge(docs):
+            sentences = []
+            for sentence in SENTENCE_RE.split(segment):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                words = frozenset(WORD_RE.findall(sentence.lower()))
+                normalized = " ".join(sorted(words))
+                if normalized in seen or self._near_duplicate(words, kept_words):
+                    continue
+                cost = estimate_tokens(sentence) + 1
+                if self.budget > 0 and used + cost > self.budget:
+                    full = True
+                    break
+                used += cost
+                seen.add(normalized)
+                kept_words.append(words)
+                sentences.append(sentence)
+            if sentences:
+                parts.append(" ".join(sentences))
+            if full:
+                break
+
+        context = "\n\n".join(parts)
+        packed = estimate_tokens(context)
+        CONTEXT_TOKENS.inc(raw, stage="retrieved")
+        CONTEXT_TOKENS.inc(packed, stage="packed")
+        CONTEXT_TOKENS_SAVED.inc(max(0, raw - packed))
+        return context
+
+    def _near_duplicate(self, words, kept):
+        if not words:
+            return True
+        for other in kept:
+            union = len(words | other)
+            if union and len(words & other) / union >= self.similarity:
+                return True
+        return False
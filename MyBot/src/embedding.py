@@ -1,23 +1,224 @@
+import os
+import threading
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from batcher import EmbeddingBatcher
+from embedding_server import EmbeddingClient
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+BACKENDS = ("torch", "int8")
+# Weight dtype of the Linear layers per backend (int8 quantizes them dynamically to torch.qint8)
+WEIGHT_DTYPES = {"torch": "float32", "int8": "qint8"}
+
+
+def _tensor_bytes(value):
+    # Dynamically quantized Linear layers keep their weights as packed (weight, bias) tuples
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v) for v in value)
+    if hasattr(value, "element_size"):
+        return value.numel() * value.element_size()
+    return 0
+
 
 class EmbeddingModel:
-    def __init__(self, name="all-MiniLM-L6-v2"):
-        print(f"🔄 Loading embedding model: {name}")
+    """
+    SentenceTransformer wrapper. The model is loaded lazily on first encode,
+    use get_embedding_model() to share one instance across the process.
+
+    EMBEDDING_BACKEND picks the inference backend: torch (fp32 weights) or int8
+    (Linear layers dynamically quantized to int8 on CPU after loading the cached
+    model). EMBEDDING_THREADS sets the torch intra-op thread count.
+
+    With EMBEDDING_SERVER_SOCKET set, encodes go to the shared embedding server
+    (see embedding_server.py) and the model is only loaded here if the server
+    cannot be reached; the server is retried after EMBEDDING_SERVER_RETRY seconds.
+    """
+    def __init__(self, name=DEFAULT_MODEL, batch_wait_ms=None, max_batch=None, server_socket=None,
+                 backend=None, threads=None):
+        self.name = name
+        self.backend = (backend or os.getenv("EMBEDDING_BACKEND", "torch")).lower()
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {self.backend}")
+        self.threads = threads or int(os.getenv("EMBEDDING_THREADS", "0")) or None
+        self.load_seconds = None
+        self.load_error = None
+        self._loading = False
+        self._model = None
+        self._lock = threading.Lock()
+
+        server_socket = server_socket or os.getenv("EMBEDDING_SERVER_SOCKET")
+        self.remote = EmbeddingClient(server_socket) if server_socket else None
+        self.remote_retry = float(os.getenv("EMBEDDING_SERVER_RETRY", "30"))
+        self._remote_down_until = 0.0
+        self.remote_failures = 0
+
+        # Single-query encodes from concurrent requests share one forward pass. With a server the
+        # server's batcher already does this across workers, so a local one would only add latency
+        if batch_wait_ms is None:
+            batch_wait_ms = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+        self.batch_wait_ms = batch_wait_ms
+        self.max_batch = max_batch or int(os.getenv("EMBEDDING_MAX_BATCH", "32"))
+        self.batcher = self._make_batcher() if self.remote is None else None
+
+    def _make_batcher(self):
+        if self.batch_wait_ms <= 0:
+            return None
+        return EmbeddingBatcher(self._encode_batch, self.max_batch, self.batch_wait_ms, name=self.name)
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self.load_error is not None:
+                    # A failed load is not retried on every encode
+                    raise RuntimeError(f"Embedding model {self.name} failed to load: {self.load_error}")
+                if self._model is None:
+                    print(f"🔄 Loading embedding model: {self.name} ({self.backend})")
+                    start = time.perf_counter()
+                    self._loading = True
+                    try:
+                        self._model = self._load()
+                    except Exception as e:
+                        print(f"❌ Error loading embedding model: {e}")
+                        self.load_error = e
+                        raise
+                    finally:
+                        self._loading = False
+                    self.load_seconds = time.perf_counter() - start
+                    print(f"✅ Embedding model loaded in {self.load_seconds:.1f}s "
+                          f"({self.memory_footprint() / 2**20:.1f} MiB)")
+        return self._model
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+
+        if self.threads:
+            import torch
+            torch.set_num_threads(self.threads)
+
+        if self.backend == "int8":
+            import torch
+            model = SentenceTransformer(self.name, device="cpu")
+            model.eval()
+            return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        return SentenceTransformer(self.name)
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    @property
+    def ready(self):
+        """
+        False while another thread is loading the model (e.g. the startup warm-up)
+        or after the load failed, when an encode would only wait or fail
+        """
+        if self._model is not None:
+            return True
+        if self.remote is not None and time.monotonic() >= self._remote_down_until:
+            return True
+        return not self._loading and self.load_error is None
+
+    def memory_footprint(self):
+        """
+        Bytes held by the model's weights and buffers (0 until loaded)
+        """
+        if self._model is None:
+            return 0
+        return sum(_tensor_bytes(v) for v in self._model.state_dict().values())
+
+    def warm_up(self):
+        """Make the first encode fast: check the server, else load the model here"""
+        if self.remote is not None:
+            try:
+                info = self.remote.info()
+                if info.get("model") == self.name and info.get("backend") == self.backend:
+                    print(f"🧮 Using embedding server {self.remote.socket_path} (pid {info.get('pid')})")
+                    return
+                print(f"⚠️  Embedding server serves {info.get('model')} ({info.get('backend')}), "
+                      f"not {self.name} ({self.backend}); encoding locally")
+                self.remote = None
+                self.batcher = self._make_batcher()
+            except Exception as e:
+                self._remote_failed(e)
+        self.model
+
+    def _remote_failed(self, error):
+        self.remote_failures += 1
+        self._remote_down_until = time.monotonic() + self.remote_retry
+        print(f"⚠️  Embedding server unavailable ({error}), encoding locally for {self.remote_retry:.0f}s")
+
+    def _encode_remote(self, texts, kind):
+        """Vectors from the embedding server, or None to encode locally"""
+        if self.remote is None or time.monotonic() < self._remote_down_until:
+            return None
         try:
-            self.model = SentenceTransformer(name)
+            return self.remote.encode(texts, kind)
         except Exception as e:
-            print(f"❌ Error loading embedding model: {e}")
-            raise
+            self._remote_failed(e)
+            return None
+
+    def stats(self):
+        return {
+            "model": self.name,
+            "backend": self.backend,
+            "threads": self.threads,
+            "server": self.remote.socket_path if self.remote else None,
+            "loaded": self.loaded,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds else None,
+            "memory_mb": round(self.memory_footprint() / 2**20, 1),
+            "batcher": self.batcher.stats() if self.batcher else None
+        }
+
+    def _encode_batch(self, texts):
+        vectors = self._encode_remote(texts, "query")
+        if vectors is not None:
+            return vectors
+        return np.asarray(self.model.encode(texts, show_progress_bar=False))
+
+    def encode_queries(self, texts):
+        """
+        Hot-path encode for a few short texts (queries, responses). Goes through
+        the micro-batcher when enabled; raises on failure instead of returning [].
+        Lists of a full batch or more are already vectorized and skip the queue.
+        """
+        if self.batcher and len(texts) < self.batcher.max_batch:
+            return self.batcher.encode(texts)
+        return self._encode_batch(texts)
+
+    def encode_query(self, text):
+        return self.encode_queries([text])[0]
 
     def encode(self, texts):
         if not texts:
             print("⚠️  No texts to embed")
             return np.array([])
-            
+
         print(f"Embedding {len(texts)} texts...")
+        vectors = self._encode_remote(texts, "bulk")
+        if vectors is not None:
+            return vectors
         try:
-            return np.array(self.model.encode(texts, show_progress_bar=True))
+            return np.array(self.model.encode(texts, show_progress_bar=len(texts) > 32))
         except Exception as e:
             print(f"❌ Error embedding texts: {e}")
-            return np.array([])
\ No newline at end of file
+            return np.array([])
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_embedding_model(name=DEFAULT_MODEL):
+    """
+    Process-wide shared EmbeddingModel, one instance per model name
+    """
+    with _models_lock:
+        if name not in _models:
+            _models[name] = EmbeddingModel(name)
+        return _models[name]
+
+
+def embedding_stats():
+    with _models_lock:
+        return [m.stats() for m in _models.values()]
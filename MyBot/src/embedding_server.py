@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Local embedding service: one process owns the SentenceTransformer and every
+worker process encodes through it over a Unix domain socket, so the model is
+held in RAM once instead of once per worker.
+
+    python src/embedding_server.py --socket /tmp/medibot-embedding.sock
+    EMBEDDING_SERVER_SOCKET=/tmp/medibot-embedding.sock uvicorn asgi:app --workers 4
+
+Query encodes from all connections go through the server's micro-batcher, so
+concurrent requests from different workers share forward passes. Bulk
+encodes (ingestion) run directly. EmbeddingModel switches to the server when
+EMBEDDING_SERVER_SOCKET is set and falls back to a local model when it is
+not reachable.
+
+Wire format, both directions: 4-byte big-endian header length, JSON header,
+then header["nbytes"] bytes of payload (the float32 vectors in a response).
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+import numpy as np
+
+HEADER = struct.Struct(">I")
+MAX_HEADER_BYTES = 64 * 2**20
+MAX_TEXTS = 4096
+
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        read = sock.recv_into(view[got:], n - got)
+        if not read:
+            raise ConnectionError("embedding server connection closed")
+        got += read
+    return buf
+
+
+def send_message(sock, header, payload=b""):
+    header = dict(header, nbytes=len(payload))
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(HEADER.pack(len(data)) + data + payload)
+
+
+def recv_message(sock):
+    (length,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if length > MAX_HEADER_BYTES:
+        raise ConnectionError(f"embedding message header too large ({length} bytes)")
+    header = json.loads(_recv_exact(sock, length))
+    payload = _recv_exact(sock, header.get("nbytes", 0)) if header.get("nbytes") else b""
+    return header, payload
+
+
+class EmbeddingClient:
+    """
+    Client for the embedding server. Keeps a small pool of persistent
+    connections; encode() raises OSError/RuntimeError when the server fails.
+    """
+    def __init__(self, socket_path, timeout=None, max_texts=512):
+        self.socket_path = socket_path
+        self.timeout = timeout or float(os.getenv("EMBEDDING_SERVER_TIMEOUT", "30"))
+        self.max_texts = max_texts
+        self._pool = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _closed_by_server(self, sock):
+        """An idle pooled connection the server has closed (e.g. on restart) reads EOF without blocking"""
+        sock.setblocking(False)
+        try:
+            return sock.recv(1, socket.MSG_PEEK) == b""
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+        finally:
+            sock.settimeout(self.timeout)
+
+    def _request(self, header):
+        with self._lock:
+            sock = self._pool.pop() if self._pool else None
+        if sock is not None and self._closed_by_server(sock):
+            sock.close()
+            sock = None
+
+        # Resent only when it cannot have reached the server: a pooled connection reset while sending.
+        # Timeouts and failures after the request went out are raised, never retried.
+        for attempt in range(2):
+            pooled = sock is not None
+            if sock is None:
+                sock = self._connect()
+            try:
+                send_message(sock, header)
+                break
+            except (BrokenPipeError, ConnectionResetError, ConnectionRefusedError):
+                sock.close()
+                sock = None
+                if attempt or not pooled:
+                    raise
+            except BaseException:
+                sock.close()
+                raise
+        try:
+            response, payload = recv_message(sock)
+        except BaseException:
+            sock.close()
+            raise
+        with self._lock:
+            self._pool.append(sock)
+
+        if "error" in response:
+            raise RuntimeError(f"embedding server: {response['error']}")
+        return response, payload
+
+    def info(self):
+        return self._request({"op": "info"})[0]
+
+    def encode(self, texts, kind="query"):
+        """float32 array of shape (len(texts), dim)"""
+        parts = []
+        for start in range(0, len(texts), self.max_texts):
+            response, payload = self._request({"op": "encode", "kind": kind,
+                                               "texts": list(texts[start:start + self.max_texts])})
+            parts.append(np.frombuffer(payload, dtype=np.float32).reshape(response["shape"]))
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for sock in pool:
+            sock.close()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        model = self.server.model
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+
+            try:
+                op = header.get("op")
+                if op == "info":
+                    send_message(self.request, {"model": model.name, "backend": model.backend, "loaded": model.loaded,
+                                                "pid": os.getpid(), "stats": model.stats()})
+                    continue
+                if op != "encode":
+                    raise ValueError(f"unknown op {op!r}")
+
+                texts = header.get("texts") or []
+                if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                    raise ValueError("texts must be a list of strings")
+                if len(texts) > MAX_TEXTS:
+                    raise ValueError(f"at most {MAX_TEXTS} texts per request")
+
+                if not texts:
+                    vectors = np.zeros((0, 0), dtype=np.float32)
+                elif header.get("kind") == "bulk":
+                    vectors = model.encode(texts)
+                    if vectors.size == 0:
+                        raise RuntimeError("encoding failed")
+                else:
+                    vectors = model.encode_queries(texts)
+                vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+                send_message(self.request, {"shape": list(vectors.shape)}, vectors.tobytes())
+            except Exception as e:
+                try:
+                    send_message(self.request, {"error": str(e)})
+                except OSError:
+                    return
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Every worker thread may connect at once; a full backlog fails connect() with EAGAIN on Unix sockets
+    request_queue_size = 128
+
+    def __init__(self, socket_path, model):
+        self.model = model
+        self.socket_path = socket_path
+        _claim_socket_path(socket_path)
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _claim_socket_path(path):
+    """Remove a stale socket file; refuse to start when another server is answering on it"""
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"An embedding server is already listening on {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding model server")
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SERVER_SOCKET", "/tmp/medibot-embedding.sock"))
+    parser.add_argument("--model", default=None, help="SentenceTransformer name (defaults to the app's model)")
+    args = parser.parse_args()
+
+    # The server itself always encodes locally
+    os.environ.pop("EMBEDDING_SERVER_SOCKET", None)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from embedding import DEFAULT_MODEL, EmbeddingModel
+
+    model = EmbeddingModel(args.model or DEFAULT_MODEL)
+    model.model
+    server = EmbeddingServer(args.socket, model)
+    print(f"🧮 Embedding server for {model.name} on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
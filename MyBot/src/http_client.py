@@ -0,0 +1,207 @@
+import asyncio
+import json
+import random
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://openrouter.ai/api/v1/chat/completions"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def encode_request(messages, **params) -> str:
+    """
+    Serialize the model-independent part of a completion request once per question.
+    with_model() splices the model name in for each attempt.
+    """
+    return json.dumps({"messages": messages, **params})
+
+
+def with_model(encoded: str, model: str) -> bytes:
+    return ('{"model": ' + json.dumps(model) + ', ' + encoded[1:]).encode("utf-8")
+
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date), else None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _RetryPolicy:
+    """Timeouts and backoff shared by the sync and async clients"""
+    def __init__(self, api_key, base_url, headers, max_retries, backoff, connect_timeout, read_timeout):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            **(headers or {})
+        }
+
+    def _timeouts(self, deadline):
+        """(connect, read) timeouts, shrunk to what is left before the deadline"""
+        read = self.read_timeout
+        if deadline is not None:
+            read = max(0.5, min(read, deadline - time.monotonic()))
+        return min(self.connect_timeout, read), read
+
+    def _retry_delay(self, attempt, deadline, response=None):
+        """Seconds to back off before the next attempt; None when that would overrun the deadline"""
+        delay = _retry_after(response) if response is not None else None
+        if delay is None:
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+
+class OpenRouterClient(_RetryPolicy):
+    """
+    Keep-alive, connection-pooled client for the chat completions endpoint.
+    429/5xx responses and connection errors are retried with exponential backoff
+    (Retry-After wins when present). `transport` is a requests adapter mounted
+    in place of the default pool, so a stub can stand in for the network.
+    """
+    def __init__(self, api_key, base_url=BASE_URL, headers=None, pool_size=10, max_retries=2,
+                 backoff=0.5, connect_timeout=5.0, read_timeout=30.0, transport=None):
+        super().__init__(api_key, base_url, headers, max_retries, backoff, connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = transport or HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _sleep_before_retry(self, attempt, deadline, response=None):
+        """Back off before the next attempt; False when that would overrun the deadline"""
+        delay = self._retry_delay(attempt, deadline, response)
+        if delay is None:
+            return False
+        time.sleep(delay)
+        return True
+
+    def post(self, body: bytes, deadline=None, stream=False):
+        """
+        POST an encoded request. Returns the parsed JSON body, or the open
+        response when stream=True. Raises RuntimeError on final failure.
+        """
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                response = self.session.post(
+                    self.base_url, data=body, timeout=self._timeouts(deadline), stream=stream
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if last or not self._sleep_before_retry(attempt, deadline):
+                    raise RuntimeError(f"API request failed: {e}")
+                continue
+
+            if response.status_code in RETRY_STATUSES and not last:
+                response.close()
+                if self._sleep_before_retry(attempt, deadline, response):
+                    continue
+
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                response.close()
+                raise RuntimeError(f"API request failed: {e}")
+
+            if stream:
+                return response
+            try:
+                return response.json()
+            except ValueError:
+                raise RuntimeError("Invalid JSON response")
+
+    def stream(self, body: bytes, deadline=None):
+        """
+        POST a request with "stream": true and yield content deltas from the
+        server-sent events until [DONE]
+        """
+        response = self.post(body, deadline=deadline, stream=True)
+        try:
+            for line in response.iter_lines():
+                # Skip keep-alive comments (": OPENROUTER PROCESSING") and blank separators
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    raise RuntimeError(f"API Error: {chunk['error']}")
+                choices = chunk.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+        finally:
+            response.close()
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncOpenRouterClient(_RetryPolicy):
+    """
+    asyncio counterpart of OpenRouterClient built on httpx, for the ASGI
+    serving path. Same retry/backoff rules; cancelling the awaiting task
+    aborts the request. `transport` is an httpx transport (e.g. MockTransport).
+    """
+    def __init__(self, api_key, base_url=BASE_URL, headers=None, pool_size=100, max_retries=2,
+                 backoff=0.5, connect_timeout=5.0, read_timeout=30.0, transport=None):
+        import httpx
+
+        super().__init__(api_key, base_url, headers, max_retries, backoff, connect_timeout, read_timeout)
+        self._httpx = httpx
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport
+        )
+
+    async def post(self, body: bytes, deadline=None):
+        """POST an encoded request and return the parsed JSON body"""
+        httpx = self._httpx
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            connect, read = self._timeouts(deadline)
+            try:
+                response = await self.client.post(
+                    self.base_url, content=body,
+                    timeout=httpx.Timeout(read, connect=connect)
+                )
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                delay = None if last else self._retry_delay(attempt, deadline)
+                if delay is None:
+                    raise RuntimeError(f"API request failed: {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code in RETRY_STATUSES and not last:
+                delay = self._retry_delay(attempt, deadline, response)
+                if delay is not None:
+                    await asyncio.sleep(delay)
+                    continue
+
+            if response.is_error:
+                raise RuntimeError(f"API request failed: {response.status_code} {response.reason_phrase}")
+            try:
+                return response.json()
+            except ValueError:
+                raise RuntimeError("Invalid JSON response")
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,320 @@
+import hashlib
+import json
+import os
+import queue
+import tempfile
+import threading
+
+from embedding import WEIGHT_DTYPES
+from filelock import FileLock
+from loader import ParallelLoader
+
+MANIFEST_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_hash(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(source: str, chunks):
+    """
+    Deterministic ids derived from each chunk's content hash.
+    Identical chunks inside one file get an occurrence suffix so ids stay unique.
+    """
+    ids = []
+    seen = {}
+    for c in chunks:
+        base = content_hash(f"{source}\0{c.page_content}")[:32]
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        ids.append(base if n == 0 else f"{base}-{n}")
+    return ids
+
+
+class IngestionManifest:
+    """
+    JSON record of what is already in the vector store:
+    per-file content hash/size/mtime and the ids of the chunks it produced
+    """
+    def __init__(self, path="data/vector_store/ingest_manifest.json"):
+        self.path = path
+        self.load()
+
+    def load(self):
+        """(Re)read the manifest from disk, e.g. after another process synced"""
+        self.exists = False
+        self.pipeline = None
+        self.files = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.pipeline = data.get("pipeline")
+                    self.files = data.get("files", {})
+                    self.exists = True
+            except Exception as e:
+                print(f"⚠️  Ignoring unreadable ingestion manifest: {e}")
+
+    def chunk_count(self):
+        return sum(len(entry["chunks"]) for entry in self.files.values())
+
+    def save(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": MANIFEST_VERSION,
+                    "pipeline": self.pipeline,
+                    "files": self.files
+                }, f, indent=1)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.exists = True
+
+
+class Ingestor:
+    """
+    Keeps the vector store (and the optional BM25 index) in sync with the data directories.
+    Only new or changed chunks are embedded, chunks of deleted files are removed.
+
+    Changed files stream through parse (process pool) -> chunk -> embed
+    (batches of batch_size chunks) -> upsert, with bounded queues between the
+    stages, so memory depends on the batch size and worker count rather than
+    on the size of the corpus.
+    """
+    def __init__(self, loader, chunker, embedder, store, manifest=None, sparse=None,
+                 workers=None, batch_size=None, queue_depth=None):
+        self.loader = loader
+        self.chunker = chunker
+        self.embedder = embedder
+        self.store = store
+        self.sparse = sparse
+        self.workers = workers
+        self.batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", "64"))
+        self.queue_depth = queue_depth or int(os.getenv("INGEST_QUEUE_DEPTH", "4"))
+        self.manifest = manifest or IngestionManifest(
+            os.path.join(store.path, "ingest_manifest.json")
+        )
+
+    def pipeline_signature(self):
+        """
+        Anything that changes chunk text or vectors invalidates the whole store
+        """
+        return {
+            "chunk_size": self.chunker.size,
+            "chunk_overlap": self.chunker.overlap,
+            "embedding_model": self.embedder.name,
+            "embedding_backend": self.embedder.backend,
+            "embedding_weights": WEIGHT_DTYPES[self.embedder.backend]
+        }
+
+    def _needs_rebuild(self):
+        if not self.manifest.exists:
+            return self.store.count() > 0
+        if self.manifest.pipeline != self.pipeline_signature():
+            return True
+        # Store was wiped or diverged behind the manifest's back
+        return self.store.count() != self.manifest.chunk_count()
+
+    def _upsert(self, ids, chunks, vectors):
+        self.store.upsert(ids, chunks, vectors)
+        if self.sparse is not None:
+            self.sparse.upsert(ids, [c.page_content for c in chunks], [c.metadata for c in chunks])
+
+    def _delete(self, ids):
+        self.store.delete(ids)
+        if self.sparse is not None:
+            self.sparse.delete(ids)
+
+    def _backfill_sparse(self):
+        """
+        Re-chunk every known file into the BM25 index (no embedding needed),
+        e.g. the first time the index is enabled on an existing store
+        """
+        print("🔤 BM25 index does not match ingestion manifest, rebuilding it...")
+        self.sparse.reset()
+        items = [(path, loader) for path, loader in self.loader.files()
+                 if str(path) in self.manifest.files]
+        for path, docs in ParallelLoader(self.workers).load(items):
+            chunks = self.chunker.split(docs)
+            ids = chunk_ids(str(path), chunks)
+            self.sparse.upsert(ids, [c.page_content for c in chunks], [c.metadata for c in chunks])
+
+    def _ingest(self, todo, stats):
+        """
+        Parse, chunk, embed and upsert the changed files as a pipeline.
+
+        The calling thread parses (via the process pool) and chunks, and cuts
+        the new chunks into batches; one thread embeds batches, another upserts
+        them. A file's manifest entry is written (and its stale chunks deleted)
+        with the batch holding its last new chunk, so a failed embedding leaves
+        the file as it was.
+        """
+        known = self.manifest.files
+        files = {str(path): (stat, digest) for path, _, stat, digest in todo}
+        embed_q = queue.Queue(self.queue_depth)
+        upsert_q = queue.Queue(self.queue_depth)
+        errors = []
+
+        def embed_worker():
+            while True:
+                batch = embed_q.get()
+                if batch is None:
+                    upsert_q.put(None)
+                    return
+                items, done = batch
+                vectors = None
+                if items and not errors:
+                    try:
+                        vectors = self.embedder.encode([c.page_content for _, _, c in items])
+                    except Exception as e:
+                        errors.append(e)
+                upsert_q.put((items, vectors, done))
+
+        def upsert_worker():
+            failed = set()
+            while True:
+                batch = upsert_q.get()
+                if batch is None:
+                    return
+                items, vectors, done = batch
+                if errors:
+                    continue
+                try:
+                    if items:
+                        if vectors is None or vectors.size == 0:
+                            failed.update(key for key, _, _ in items)
+                        else:
+                            self._upsert([cid for _, cid, _ in items], [c for _, _, c in items], vectors)
+                            stats["embedded"] += len(items)
+                    for key, ids, fresh, stale in done:
+                        if key in failed:
+                            # Undo the batches of this file that did make it in
+                            print(f"⚠️  Skipping {os.path.basename(key)}: embedding failed")
+                            self._delete(fresh)
+                            continue
+                        self._delete(stale)
+                        stats["deleted_chunks"] += len(stale)
+                        stat, digest = files[key]
+                        known[key] = {
+                            "hash": digest,
+                            "size": stat.st_size,
+                            "mtime": stat.st_mtime,
+                            "chunks": ids
+                        }
+                        stats["updated"] += 1
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=embed_worker, name="ingest-embed", daemon=True),
+                   threading.Thread(target=upsert_worker, name="ingest-upsert", daemon=True)]
+        for t in threads:
+            t.start()
+
+        items, done = [], []
+        try:
+            for path, docs in ParallelLoader(self.workers).load((path, loader) for path, loader, _, _ in todo):
+                if errors:
+                    break
+                key = str(path)
+                chunks = self.chunker.split(docs)
+                ids = chunk_ids(key, chunks)
+                entry = known.get(key)
+                old = set(entry["chunks"]) if entry else set()
+                fresh = [(cid, c) for cid, c in zip(ids, chunks) if cid not in old]
+
+                for cid, c in fresh:
+                    items.append((key, cid, c))
+                    if len(items) >= self.batch_size:
+                        embed_q.put((items, done))
+                        items, done = [], []
+                done.append((key, ids, [cid for cid, _ in fresh], old - set(ids)))
+                if len(done) >= self.batch_size:
+                    embed_q.put((items, done))
+                    items, done = [], []
+            if items or done:
+                embed_q.put((items, done))
+        finally:
+            embed_q.put(None)
+            for t in threads:
+                t.join()
+
+        if errors:
+            raise RuntimeError(f"Ingestion failed: {errors[0]}") from errors[0]
+
+    def sync(self):
+        """
+        Bring the store up to date. Every worker process calls this at startup,
+        so the whole sync runs under a file lock in the store directory; a
+        process that waited for it starts from what the previous one wrote.
+        """
+        with FileLock(os.path.join(self.store.path, "ingest.lock")):
+            self.manifest.load()
+            self.store.refresh()
+            if self.sparse is not None:
+                self.sparse.reload()
+            return self._sync()
+
+    def _sync(self):
+        stats = {"unchanged": 0, "updated": 0, "removed": 0, "embedded": 0, "deleted_chunks": 0}
+
+        if self._needs_rebuild():
+            print("♻️  Vector store does not match ingestion manifest, rebuilding...")
+            self.store.reset()
+            if self.sparse is not None:
+                self.sparse.reset()
+            self.manifest.files = {}
+        self.manifest.pipeline = self.pipeline_signature()
+
+        known = self.manifest.files
+        seen = set()
+        todo = []
+
+        for path, loader in self.loader.files():
+            key = str(path)
+            seen.add(key)
+            stat = path.stat()
+            entry = known.get(key)
+
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                stats["unchanged"] += 1
+                continue
+
+            digest = file_hash(path)
+            if entry and entry["hash"] == digest:
+                entry["size"], entry["mtime"] = stat.st_size, stat.st_mtime
+                stats["unchanged"] += 1
+                continue
+
+            todo.append((path, loader, stat, digest))
+
+        if todo:
+            self._ingest(todo, stats)
+
+        for key in set(known) - seen:
+            self._delete(known[key]["chunks"])
+            stats["deleted_chunks"] += len(known[key]["chunks"])
+            stats["removed"] += 1
+            del known[key]
+
+        self.manifest.save()
+        if self.sparse is not None:
+            if self.sparse.count() != self.manifest.chunk_count():
+                self._backfill_sparse()
+            self.sparse.save()
+        print(f"📚 Ingestion: {stats['updated']} updated, {stats['unchanged']} unchanged, "
+              f"{stats['removed']} removed, {stats['embedded']} chunks embedded")
+        return stats
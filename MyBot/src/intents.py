@@ -0,0 +1,198 @@
+"""
+Intent routing for canned and fallback answers.
+
+Intents come from data/intents.json, grouped ("canned", "fallback", ...).
+Every pattern is compiled once into a single Aho-Corasick automaton over
+the normalized query (lowercase words separated by single spaces), so a
+lookup is one pass over the query no matter how many patterns there are.
+Patterns only match whole words: "hi" matches "hi there" but not "this"
+or "chemistry". A trailing * makes the last word a prefix ("appointment*"
+also matches "appointments").
+
+When several intents of a group match, the longest matched pattern wins,
+then the intent listed first. Intents with "examples" can also be picked
+by nearest-centroid classification of the query embedding, for queries
+that share no keyword with any pattern.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import deque
+
+import numpy as np
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(WORD_RE.findall(text.lower()))
+
+
+class Intent:
+    __slots__ = ("name", "group", "answer", "patterns", "examples", "order")
+
+    def __init__(self, name, group, answer, patterns=(), examples=(), order=0):
+        self.name = name
+        self.group = group
+        self.answer = answer
+        self.patterns = list(patterns)
+        self.examples = list(examples)
+        self.order = order
+
+    def __repr__(self):
+        return f"Intent({self.group}/{self.name})"
+
+
+class Automaton:
+    """Aho-Corasick automaton over characters; match() yields (value, length) per occurrence"""
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+    def add(self, pattern, value):
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append((value, len(pattern)))
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def match(self, text):
+        state = 0
+        for ch in text:
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            yield from self.out[state]
+
+
+class IntentRouter:
+    """
+    Compiled intents. route(query, group) returns the matching Intent or None;
+    pass the query embedding to fall back on centroid classification.
+    """
+    def __init__(self, intents, defaults=None, embedder=None, threshold=None):
+        self.intents = list(intents)
+        self.defaults = defaults or {}
+        self.embedder = embedder
+        self.threshold = threshold or float(os.getenv("INTENT_CENTROID_THRESHOLD", "0.6"))
+        self._centroids = None
+        self._lock = threading.Lock()
+
+        self.automaton = Automaton()
+        for intent in self.intents:
+            for pattern in intent.patterns:
+                prefix = pattern.endswith("*")
+                words = normalize(pattern.rstrip("*"))
+                if words:
+                    # Spaces delimit words in the normalized query; a prefix pattern leaves the end open
+                    self.automaton.add(" " + words + ("" if prefix else " "), intent)
+        self.automaton.build()
+
+    @classmethod
+    def from_file(cls, path="data/intents.json", embedder=None, threshold=None):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        intents, defaults = [], {}
+        for group, entries in data.items():
+            if group.endswith("_default"):
+                defaults[group[:-len("_default")]] = entries
+                continue
+            if not isinstance(entries, list):
+                continue
+            for entry in entries:
+                intents.append(Intent(entry["name"], group, entry["answer"],
+                                      entry.get("patterns", ()), entry.get("examples", ()), len(intents)))
+        return cls(intents, defaults, embedder, threshold)
+
+    def match(self, query, group):
+        """Keyword match only (no embedding)"""
+        best, best_len = None, 0
+        for intent, length in self.automaton.match(f" {normalize(query)} "):
+            if intent.group != group:
+                continue
+            if length > best_len or (length == best_len and intent.order < best.order):
+                best, best_len = intent, length
+        return best
+
+    def route(self, query, group, query_embedding=None):
+        intent = self.match(query, group)
+        if intent is None and query_embedding is not None:
+            intent = self.classify(query_embedding, group)
+        return intent
+
+    def answer(self, query, group, query_embedding=None):
+        """Answer of the routed intent, else the group's default (may be None)"""
+        intent = self.route(query, group, query_embedding)
+        return intent.answer if intent else self.defaults.get(group)
+
+    def classify(self, query_embedding, group):
+        """Nearest intent centroid of the group by cosine similarity, if above threshold"""
+        centroids = self._get_centroids()
+        if group not in centroids:
+            return None
+        intents, matrix = centroids[group]
+        q = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if not norm:
+            return None
+        scores = matrix @ (q / norm)
+        i = int(np.argmax(scores))
+        return intents[i] if scores[i] >= self.threshold else None
+
+    def warm_up(self):
+        """Compute the centroids ahead of the first classify()"""
+        self._get_centroids()
+
+    def _get_centroids(self):
+        """Mean normalized embedding of each intent's examples, computed once on first use"""
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    self._centroids = self._build_centroids()
+        return self._centroids
+
+    def _build_centroids(self):
+        with_examples = [i for i in self.intents if i.examples]
+        if self.embedder is None or not with_examples:
+            return {}
+        try:
+            texts = [e for i in with_examples for e in i.examples]
+            vectors = np.asarray(self.embedder.encode_queries(texts), dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️  Intent centroids disabled: {e}")
+            return {}
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        centroids = {}
+        start = 0
+        for intent in with_examples:
+            centroid = vectors[start:start + len(intent.examples)].mean(axis=0)
+            start += len(intent.examples)
+            centroid /= max(np.linalg.norm(centroid), 1e-12)
+            intents, rows = centroids.setdefault(intent.group, ([], []))
+            intents.append(intent)
+            rows.append(centroid)
+        print(f"🧭 Intent centroids ready for {len(with_examples)} intents")
+        return {group: (intents, np.stack(rows)) for group, (intents, rows) in centroids.items()}
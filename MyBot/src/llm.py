@@ -1,28 +1,101 @@
 import os
-import json
-import requests
 import re
+import asyncio
+import threading
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from embedding import get_embedding_model
+from semantic_cache import SemanticCache, context_fingerprint
+from scoreboard import ModelScoreboard
+from intents import IntentRouter
+from http_client import BASE_URL, OpenRouterClient, AsyncOpenRouterClient, encode_request, with_model
+import metrics
 
-BASE_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+FALLBACK_ANSWER = ("For hospital services, use the patient dashboard to book appointments, "
+                   "contact doctors, or access diagnostic services.")
+
+
+def _hedge_delay_from_env():
+    """LLM_HEDGE_DELAY seconds before racing the next model; 'off' keeps strict fallback"""
+    value = os.getenv("LLM_HEDGE_DELAY", "4").strip().lower()
+    if value in ("", "off", "none", "false"):
+        return None
+    return float(value)
+
+class StreamCleaner:
+    """
+    Incremental counterpart of MultiLLM._clean_response for streamed tokens:
+    drops markdown symbols, collapses whitespace and stops after two sentences
+    """
+    def __init__(self, max_sentences=2):
+        self.max_sentences = max_sentences
+        self.sentences = 0
+        self.finished = False
+        self._raw = []
+        self._started = False
+        self._in_sentence = False
+        self._pending_space = False
+
+    @property
+    def text(self):
+        return "".join(self._raw)
+
+    def feed(self, delta):
+        self._raw.append(delta)
+        out = []
+        for ch in delta:
+            if self.finished:
+                break
+            if ch in "*#_-`":
+                continue
+            if ch.isspace():
+                self._pending_space = self._started
+                continue
+            if self._pending_space:
+                out.append(" ")
+                self._pending_space = False
+            out.append(ch)
+            self._started = True
+            if ch in ".!?":
+                if self._in_sentence:
+                    self.sentences += 1
+                    self._in_sentence = False
+                    self.finished = self.sentences >= self.max_sentences
+            else:
+                self._in_sentence = True
+        return "".join(out)
 
 class MultiLLM:
     """
     Enhanced LLM wrapper with multiple model fallbacks and embedding validation
     """
-    
-    def __init__(self):
+    _closing = set()    # strong references to pending aclose() tasks of stale async clients
+
+    def __init__(self, client=None, async_client=None):
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
             raise RuntimeError("Missing OPENROUTER_API_KEY in .env")
 
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:5000",
-            "X-Title": "MediBot"
+        self._client_options = {
+            "base_url": os.getenv("OPENROUTER_BASE_URL", BASE_URL),
+            "headers": {"HTTP-Referer": "http://localhost:5000", "X-Title": "MediBot"},
+            "max_retries": int(os.getenv("OPENROUTER_MAX_RETRIES", "2")),
+            "connect_timeout": float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "5")),
+            "read_timeout": float(os.getenv("OPENROUTER_READ_TIMEOUT", "30"))
         }
+        # One keep-alive connection pool for every model attempt
+        self.client = client or OpenRouterClient(
+            self.api_key,
+            pool_size=int(os.getenv("OPENROUTER_POOL_SIZE", "10")),
+            **self._client_options
+        )
+        # Created on first use by the async serving path (needs httpx and a running loop), one per loop
+        self._async_client = async_client
+        self._async_clients = {}
+        self._async_clients_lock = threading.Lock()
         
         # List of models to try in order (free tier models)
         self.models = [
@@ -35,55 +108,78 @@ class MultiLLM:
             "meta-llama/llama-3.2-3b-instruct:free"
         ]
         
-        # Initialize embedding model for response validation
-        self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        # Chain order adapts to observed health; failing models are skipped for a cool-down
+        self.scoreboard = ModelScoreboard(
+            self.models,
+            failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "3")),
+            cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "60")),
+            trial_timeout=float(os.getenv("LLM_DEADLINE", "45"))
+        )
+
+        # Hedged fallback: race the next model if no validated answer after hedge_delay
+        self.hedge_delay = _hedge_delay_from_env()
+        self.max_parallel = int(os.getenv("LLM_MAX_PARALLEL", "3"))
+        # Hard ceiling on the time one question may spend across all models
+        self.deadline = float(os.getenv("LLM_DEADLINE", "45"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("LLM_MAX_WORKERS", "16")),
+            thread_name_prefix="llm"
+        )
+
+        # Shared embedding model for response validation (same instance as the retriever)
+        self.embedder = get_embedding_model()
+
+        # Validated answers reused for paraphrased questions over the same context
+        self.answer_cache = SemanticCache(
+            path=os.getenv("SEMANTIC_CACHE_PATH", "data/semantic_cache"),
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            maxsize=int(os.getenv("SEMANTIC_CACHE_SIZE", "1000")),
+            ttl=float(os.getenv("SEMANTIC_CACHE_TTL", str(7 * 24 * 3600)))
+        )
         
-        # Predefined concise answers for common questions
-        self.common_answers = {
-            "book appointment": "You can book an appointment through the patient dashboard. Select your preferred doctor and time slot.",
-            "how to book": "Go to the Book Appointment section in your patient dashboard, choose a doctor, and select an available time slot.",
-            "doctor appointment": "Book appointments through the patient dashboard. Doctors will confirm and you'll receive notifications.",
-            "diagnostic test": "Contact diagnostic centers through the diagnostic section. They will schedule your tests and share reports.",
-            "emergency": "For emergencies, call our emergency helpline or use the ambulance service from the patient dashboard.",
-            "hello": "Hello! I'm MediBot. How can I help you with hospital services today?",
-            "hi": "Hello! I'm MediBot. How can I help you with hospital services today?",
-            "hey": "Hello! I'm MediBot. How can I help you with hospital services today?"
-        }
+        # Canned answers for common questions and per-topic fallbacks, compiled once
+        intents_path = os.getenv("INTENTS_PATH", "data/intents.json")
+        try:
+            self.intents = IntentRouter.from_file(intents_path, embedder=self.embedder)
+        except Exception as e:
+            print(f"⚠️  Could not load intents from {intents_path}: {e}")
+            self.intents = IntentRouter([], embedder=self.embedder)
 
-    def _call_model(self, model, messages, max_tokens=150):
-        """Make API call to a specific model"""
-        payload = {
-            "model": model,
-            "messages": messages,
-            "max_tokens": max_tokens,
-            "temperature": 0.3,
-        }
+    def warm_up(self):
+        """Build the intent centroids now (needs the embedding model) instead of on the first fallback"""
+        self.intents.warm_up()
 
+    def _call_model(self, model, request, deadline=None):
+        """Make API call to a specific model (request comes from encode_request)"""
         try:
-            response = requests.post(
-                url=BASE_URL,
-                headers=self.headers,
-                data=json.dumps(payload),
-                timeout=30
-            )
+            data = self.client.post(with_model(request, model), deadline=deadline)
+        except RuntimeError as e:
+            raise RuntimeError(f"{e} ({model})")
 
-            response.raise_for_status()
-            data = response.json()
+        return self._parse_completion(model, data)
 
-            if "choices" not in data:
-                raise RuntimeError(f"API Error for {model}: {data}")
+    def _parse_completion(self, model, data):
+        if "choices" not in data:
+            raise RuntimeError(f"API Error for {model}: {data}")
 
-            msg = data["choices"][0]["message"]
-            content = msg.get("content", "").strip()
-            
-            return content
-            
-        except requests.exceptions.RequestException as e:
-            raise RuntimeError(f"API request failed for {model}: {e}")
-        except json.JSONDecodeError:
-            raise RuntimeError(f"Invalid JSON response from {model}")
+        msg = data["choices"][0]["message"]
+        return (msg.get("content") or "").strip()
+
+    def _embed_query(self, query):
+        """
+        Query embedding shared by the answer cache and validation. None on failure,
+        and while the model is loading (warm-up) so requests do not wait for it.
+        """
+        if not self.embedder.ready:
+            return None
+        try:
+            with metrics.span("query_embed"):
+                return self.embedder.encode_query(query)
+        except Exception as e:
+            print(f"❌ Error embedding query: {e}")
+            return None
 
-    def _validate_response_quality(self, response, query):
+    def _validate_response_quality(self, response, query, query_embedding=None):
         """
         Validate response quality using embedding similarity
         Returns True if response is good, False if it's generic/negative
@@ -104,8 +200,12 @@ class MultiLLM:
             
         # Use embedding similarity to check if response is relevant to query
         try:
-            query_embedding = self.embedder.encode([query])[0]
-            response_embedding = self.embedder.encode([response])[0]
+            if not self.embedder.ready:
+                raise RuntimeError("embedding model not available")
+            if query_embedding is None:
+                query_embedding, response_embedding = self.embedder.encode_queries([query, response])
+            else:
+                response_embedding = self.embedder.encode_query(response)
             
             similarity = np.dot(query_embedding, response_embedding) / (
                 np.linalg.norm(query_embedding) * np.linalg.norm(response_embedding)
@@ -149,36 +249,365 @@ class MultiLLM:
         
         query = query.strip().lower()
         
-        # Check for predefined answers first
-        for key, answer in self.common_answers.items():
-            if key in query:
-                return answer
-        
+        known, query_embedding, fingerprint = self._known_answer(query, context)
+        if known:
+            return known
+
         # Prepare the prompt
         prompt = self._build_prompt(query, context)
         messages = [{"role": "user", "content": prompt}]
+        request = encode_request(messages, max_tokens=150, temperature=0.3)
+        
+        answer = self._race_models(request, query, query_embedding)
+        if answer:
+            metrics.ANSWERS.inc(source="model")
+            self.answer_cache.put(query, query_embedding, fingerprint, answer)
+            return answer
         
-        # Try each model until we get a good response
-        for model in self.models:
+        # If all models fail, return fallback response
+        metrics.ANSWERS.inc(source="fallback")
+        return self._get_fallback_response(query, query_embedding)
+
+    def ask_stream(self, query: str, context: str):
+        """
+        Streaming variant of ask(). Yields event dicts:
+        {"type": "token", "text"} cleaned text as it arrives,
+        {"type": "reset"} when streamed text was discarded and the next model takes over,
+        {"type": "done", "answer", "model"} with the final validated (or fallback) answer.
+        """
+        if not query or not query.strip():
+            yield {"type": "done", "model": None,
+                   "answer": "Please ask a question about hospital services, appointments, or medical assistance."}
+            return
+
+        query = query.strip().lower()
+
+        known, query_embedding, fingerprint = self._known_answer(query, context)
+        if known:
+            yield {"type": "token", "text": known}
+            yield {"type": "done", "answer": known, "model": None}
+            return
+
+        prompt = self._build_prompt(query, context)
+        messages = [{"role": "user", "content": prompt}]
+        request = encode_request(messages, max_tokens=150, temperature=0.3, stream=True)
+        deadline = time.monotonic() + self.deadline
+        streamed = False
+        depth = 0
+
+        for model in self.scoreboard.ordered():
+            if time.monotonic() >= deadline:
+                print("⏱️ LLM deadline reached while streaming")
+                break
+            if not self.scoreboard.acquire(model):
+                continue
+
+            if streamed:
+                yield {"type": "reset"}
+                streamed = False
+
+            cleaner = StreamCleaner()
+            depth += 1
+            start = time.monotonic()
             try:
-                print(f"🔄 Trying model: {model}")
-                raw_response = self._call_model(model, messages)
-                cleaned_response = self._clean_response(raw_response)
-                
-                # Validate response quality
-                if self._validate_response_quality(cleaned_response, query):
-                    print(f"✅ Good response from {model}")
-                    return cleaned_response
-                else:
-                    print(f"⚠️ Poor quality response from {model}, trying next...")
-                    continue
-                    
+                print(f"🔄 Streaming from model: {model}")
+                # closing() drops the connection as soon as we stop reading, even if the caller goes away
+                with closing(self.client.stream(with_model(request, model), deadline=deadline)) as deltas:
+                    for delta in deltas:
+                        # The read timeout only bounds the gap between chunks, not a slow trickle
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError("LLM deadline reached while streaming")
+                        text = cleaner.feed(delta)
+                        if text:
+                            streamed = True
+                            yield {"type": "token", "text": text}
+                        if cleaner.finished:
+                            break
             except Exception as e:
+                self.scoreboard.record(model, time.monotonic() - start, ok=False)
+                self._observe_attempt(model, time.monotonic() - start, "error", e)
                 print(f"❌ {model} failed: {e}")
                 continue
-        
-        # If all models fail, return fallback response
-        return self._get_fallback_response(query)
+
+            latency = time.monotonic() - start
+            answer = self._clean_response(cleaner.text)
+            with metrics.span("validation"):
+                validated = self._validate_response_quality(answer, query, query_embedding)
+            self.scoreboard.record(model, latency, ok=True, validated=validated)
+            self._observe_attempt(model, latency, "validated" if validated else "rejected")
+            if validated:
+                print(f"✅ Good response from {model}")
+                metrics.ANSWERS.inc(source="model")
+                metrics.FALLBACK_DEPTH.observe(depth, outcome="answered")
+                self.answer_cache.put(query, query_embedding, fingerprint, answer)
+                yield {"type": "done", "answer": answer, "model": model}
+                return
+            print(f"⚠️ Poor quality response from {model}, trying next...")
+
+        if streamed:
+            yield {"type": "reset"}
+        metrics.ANSWERS.inc(source="fallback")
+        metrics.FALLBACK_DEPTH.observe(depth, outcome="exhausted")
+        yield {"type": "done", "answer": self._get_fallback_response(query, query_embedding), "model": None}
+
+    def _known_answer(self, query, context):
+        """
+        Canned or semantically cached answer for a normalized query.
+        Returns (answer, query_embedding, fingerprint); answer is None on a miss.
+        """
+        # Check for predefined answers first
+        intent = self.intents.match(query, "canned")
+        if intent:
+            metrics.ANSWERS.inc(source="canned")
+            return intent.answer, None, None
+
+        # Reuse a validated answer to a near-identical question over the same context
+        query_embedding = self._embed_query(query)
+        fingerprint = context_fingerprint(context)
+        cached = self.answer_cache.lookup(query_embedding, fingerprint)
+        if cached:
+            print("💾 Semantic cache hit")
+            metrics.ANSWERS.inc(source="semantic_cache")
+        return cached, query_embedding, fingerprint
+
+    def _observe_attempt(self, model, seconds, outcome, error=None):
+        """Metrics for one model attempt (outcome: validated, rejected or error)"""
+        metrics.MODEL_ATTEMPT_SECONDS.observe(seconds, model=model, outcome=outcome)
+        metrics.record("model_attempt", seconds)
+        if error is not None:
+            metrics.UPSTREAM_ERRORS.inc(model=model, kind=metrics.error_kind(error))
+
+    def _attempt(self, model, request, query, query_embedding, deadline, cancelled):
+        """One model attempt: call, clean and validate. Returns the answer or None"""
+        if cancelled.is_set():
+            self.scoreboard.release(model)
+            return None
+        start = time.monotonic()
+        try:
+            print(f"🔄 Trying model: {model}")
+            raw_response = self._call_model(model, request, deadline=deadline)
+            latency = time.monotonic() - start
+        except Exception as e:
+            self.scoreboard.record(model, time.monotonic() - start, ok=False)
+            self._observe_attempt(model, time.monotonic() - start, "error", e)
+            print(f"❌ {model} failed: {e}")
+            return None
+
+        cleaned_response = self._clean_response(raw_response)
+        # Validate response quality
+        with metrics.span("validation"):
+            validated = self._validate_response_quality(cleaned_response, query, query_embedding)
+        self.scoreboard.record(model, latency, ok=True, validated=validated)
+        self._observe_attempt(model, latency, "validated" if validated else "rejected")
+        if cancelled.is_set():
+            return None
+        if validated:
+            print(f"✅ Good response from {model}")
+            return cleaned_response
+        print(f"⚠️ Poor quality response from {model}, trying next...")
+        return None
+
+    def _race_models(self, request, query, query_embedding):
+        """
+        Walk the model chain with hedging: the next model starts as soon as an
+        attempt fails, or when hedge_delay passes without a validated answer
+        (at most max_parallel in flight). The first validated answer wins and
+        the rest are abandoned; nothing is awaited past the overall deadline.
+        """
+        deadline = time.monotonic() + self.deadline
+        cancelled = threading.Event()
+        remaining_models = iter(self.scoreboard.ordered())
+        pending = set()
+        models = {}     # future -> model, to release the ones cancelled before they ran
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            for model in remaining_models:
+                # A half-open model is only handed to one caller at a time
+                if self.scoreboard.acquire(model):
+                    launched += 1
+                    future = metrics.submit(
+                        self._executor, self._attempt, model, request, query, query_embedding, deadline, cancelled
+                    )
+                    models[future] = model
+                    pending.add(future)
+                    return
+
+        launch()
+        outcome = "exhausted"
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print("⏱️ LLM deadline reached, giving up on pending models")
+                    outcome = "deadline"
+                    return None
+
+                hedging = self.hedge_delay is not None and len(pending) < self.max_parallel
+                done, pending = wait(
+                    pending,
+                    timeout=min(self.hedge_delay, remaining) if hedging else remaining,
+                    return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    if hedging:
+                        launch()
+                    continue
+
+                for future in done:
+                    answer = future.result()
+                    if answer:
+                        outcome = "answered"
+                        return answer
+                    launch()
+            return None
+        finally:
+            metrics.FALLBACK_DEPTH.observe(launched, outcome=outcome)
+            cancelled.set()
+            for future in pending:
+                # A queued attempt that never runs never reaches its own release
+                if future.cancel():
+                    self.scoreboard.release(models[future])
+
+    @property
+    def async_client(self):
+        """httpx connections belong to one event loop, so each running loop gets its own client"""
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client, self._async_client = self._async_client, None
+                if client is None:
+                    client = AsyncOpenRouterClient(
+                        self.api_key,
+                        pool_size=int(os.getenv("OPENROUTER_ASYNC_POOL_SIZE", "100")),
+                        **self._client_options
+                    )
+                self._async_clients[loop] = client
+            dead = [l for l in self._async_clients if l.is_closed()]
+            stale = [self._async_clients.pop(l) for l in dead]
+        for old in stale:
+            self._close_stale(old)
+        return client
+
+    @staticmethod
+    def _close_stale(client):
+        """Release the pool of a client whose loop has closed; its sockets may already be gone"""
+        task = asyncio.get_running_loop().create_task(client.aclose())
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        MultiLLM._closing.add(task)
+        task.add_done_callback(MultiLLM._closing.discard)
+
+    async def ask_async(self, query: str, context: str) -> str:
+        """
+        asyncio version of ask() for the ASGI server: model attempts are
+        coroutines on the event loop, CPU-bound embedding runs in worker threads
+        """
+        if not query or not query.strip():
+            return "Please ask a question about hospital services, appointments, or medical assistance."
+
+        query = query.strip().lower()
+
+        known, query_embedding, fingerprint = await asyncio.to_thread(self._known_answer, query, context)
+        if known:
+            return known
+
+        prompt = self._build_prompt(query, context)
+        messages = [{"role": "user", "content": prompt}]
+        request = encode_request(messages, max_tokens=150, temperature=0.3)
+
+        answer = await self._race_models_async(request, query, query_embedding)
+        if answer:
+            metrics.ANSWERS.inc(source="model")
+            await asyncio.to_thread(self.answer_cache.put, query, query_embedding, fingerprint, answer)
+            return answer
+
+        metrics.ANSWERS.inc(source="fallback")
+        # Centroid classification may encode, so it stays off the event loop too
+        return await asyncio.to_thread(self._get_fallback_response, query, query_embedding)
+
+    async def _attempt_async(self, model, request, query, query_embedding, deadline):
+        start = time.monotonic()
+        try:
+            print(f"🔄 Trying model: {model}")
+            data = await self.async_client.post(with_model(request, model), deadline=deadline)
+            raw_response = self._parse_completion(model, data)
+            latency = time.monotonic() - start
+        except Exception as e:
+            self.scoreboard.record(model, time.monotonic() - start, ok=False)
+            self._observe_attempt(model, time.monotonic() - start, "error", e)
+            print(f"❌ {model} failed: {e}")
+            return None
+
+        cleaned_response = self._clean_response(raw_response)
+        with metrics.span("validation"):
+            validated = await asyncio.to_thread(
+                self._validate_response_quality, cleaned_response, query, query_embedding
+            )
+        self.scoreboard.record(model, latency, ok=True, validated=validated)
+        self._observe_attempt(model, latency, "validated" if validated else "rejected")
+        if validated:
+            print(f"✅ Good response from {model}")
+            return cleaned_response
+        print(f"⚠️ Poor quality response from {model}, trying next...")
+        return None
+
+    async def _race_models_async(self, request, query, query_embedding):
+        """Same hedging rules as _race_models; losing attempts are cancelled for real"""
+        deadline = time.monotonic() + self.deadline
+        remaining_models = iter(self.scoreboard.ordered())
+        pending = set()
+        models = {}     # task -> model, to release the ones cancelled before they recorded a result
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            for model in remaining_models:
+                if self.scoreboard.acquire(model):
+                    launched += 1
+                    task = asyncio.ensure_future(
+                        self._attempt_async(model, request, query, query_embedding, deadline)
+                    )
+                    models[task] = model
+                    pending.add(task)
+                    return
+
+        launch()
+        outcome = "exhausted"
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print("⏱️ LLM deadline reached, giving up on pending models")
+                    outcome = "deadline"
+                    return None
+
+                hedging = self.hedge_delay is not None and len(pending) < self.max_parallel
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=min(self.hedge_delay, remaining) if hedging else remaining,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    if hedging:
+                        launch()
+                    continue
+
+                for task in done:
+                    answer = task.result()
+                    if answer:
+                        outcome = "answered"
+                        return answer
+                    launch()
+            return None
+        finally:
+            metrics.FALLBACK_DEPTH.observe(launched, outcome=outcome)
+            for task in pending:
+                # Lost the race: a half-open trial that never finished is handed back,
+                # including tasks cancelled before their coroutine started
+                if task.cancel():
+                    self.scoreboard.release(models[task])
 
     def _build_prompt(self, query: str, context: str) -> str:
         """Build the prompt for the LLM"""
@@ -196,23 +625,10 @@ Question: {query}
 
 Short practical answer:"""
 
-    def _get_fallback_response(self, query: str) -> str:
+    def _get_fallback_response(self, query: str, query_embedding=None) -> str:
         """Generate a fallback response when all models fail"""
-        # Try to categorize the query and give relevant fallback
-        query_lower = query.lower()
-        
-        if any(word in query_lower for word in ['appointment', 'book', 'schedule', 'doctor']):
-            return "Book appointments through the patient dashboard. Select your doctor and preferred time slot."
-        elif any(word in query_lower for word in ['diagnostic', 'test', 'lab', 'report']):
-            return "Contact diagnostic centers through the diagnostic section to schedule tests and view reports."
-        elif any(word in query_lower for word in ['emergency', 'ambulance', 'urgent']):
-            return "For emergencies, use the ambulance service from the patient dashboard or call the emergency helpline."
-        elif any(word in query_lower for word in ['prescription', 'medicine', 'medication']):
-            return "Doctors provide prescriptions after consultations. Check your patient records for prescription details."
-        elif any(word in query_lower for word in ['report', 'result', 'diagnosis']):
-            return "View your diagnostic reports and medical records in the patient dashboard."
-        else:
-            return "For hospital services, use the patient dashboard to book appointments, contact doctors, or access diagnostic services."
+        # Topic of the query picks the fallback (see data/intents.json)
+        return self.intents.answer(query, "fallback", query_embedding) or FALLBACK_ANSWER
 
 # Backward compatibility
 class ReasoningLLM(MultiLLM):
@@ -1,4 +1,7 @@
 import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 from typing import List, Any
 from langchain_community.document_loaders import PyPDFLoader
@@ -9,20 +12,38 @@ class PDFLoader:
         self.directory = Path(directory)
         os.makedirs(self.directory, exist_ok=True)
 
+    def files(self) -> List[Path]:
+        return sorted(self.directory.glob("*.pdf"))
+
+    def page_count(self, pdf: Path) -> int:
+        from pypdf import PdfReader
+        return len(PdfReader(str(pdf)).pages)
+
+    def load_pages(self, pdf: Path, start: int, stop: int) -> List[Any]:
+        """Pages [start, stop) as PyPDFLoader would load them, so a large PDF can be split across workers"""
+        from pypdf import PdfReader
+        from langchain.schema import Document
+        reader = PdfReader(str(pdf))
+        return [Document(page_content=reader.pages[i].extract_text(), metadata={"source": pdf.name, "page": i})
+                for i in range(start, min(stop, len(reader.pages)))]
+
+    def load_file(self, pdf: Path) -> List[Any]:
+        print(f"Loading PDF: {pdf.name}")
+        loader = PyPDFLoader(str(pdf))
+        pages = loader.load()
+        for p in pages:
+            p.metadata["source"] = pdf.name
+        print(f"✅ Successfully loaded {len(pages)} pages from {pdf.name}")
+        return pages
+
     def load(self) -> List[Any]:
-        pdfs = list(self.directory.glob("*.pdf"))
+        pdfs = self.files()
         print(f"Found {len(pdfs)} PDF files")
 
         docs = []
         for pdf in pdfs:
             try:
-                print(f"Loading PDF: {pdf.name}")
-                loader = PyPDFLoader(str(pdf))
-                pages = loader.load()
-                for p in pages:
-                    p.metadata["source"] = pdf.name
-                docs.extend(pages)
-                print(f"✅ Successfully loaded {len(pages)} pages from {pdf.name}")
+                docs.extend(self.load_file(pdf))
             except Exception as e:
                 print(f"❌ Error loading PDF {pdf.name}: {e}")
                 continue
@@ -35,24 +56,30 @@ class TextLoader:
         self.directory = Path(directory)
         os.makedirs(self.directory, exist_ok=True)
 
+    def files(self) -> List[Path]:
+        return sorted(self.directory.glob("*.txt"))
+
+    def load_file(self, file: Path) -> List[Any]:
+        print(f"Loading text file: {file.name}")
+        content = file.read_text(encoding="utf-8")
+
+        # Create a document-like object
+        from langchain.schema import Document
+        doc = Document(
+            page_content=content,
+            metadata={"source": file.name, "file_type": "text"}
+        )
+        print(f"✅ Successfully loaded {file.name}")
+        return [doc]
+
     def load(self) -> List[Any]:
-        files = list(self.directory.glob("*.txt"))
+        files = self.files()
         print(f"Found {len(files)} text files")
 
         docs = []
         for file in files:
             try:
-                print(f"Loading text file: {file.name}")
-                content = file.read_text(encoding="utf-8")
-                
-                # Create a document-like object
-                from langchain.schema import Document
-                doc = Document(
-                    page_content=content,
-                    metadata={"source": file.name, "file_type": "text"}
-                )
-                docs.append(doc)
-                print(f"✅ Successfully loaded {file.name}")
+                docs.extend(self.load_file(file))
             except Exception as e:
                 print(f"❌ Error loading text file {file.name}: {e}")
                 continue
@@ -60,11 +87,112 @@ class TextLoader:
         return docs
 
 
+def _load_in_worker(loader, path, pages=None):
+    """Top-level so spawn/forkserver workers can unpickle it"""
+    if pages is None:
+        return loader.load_file(path)
+    return loader.load_pages(path, *pages)
+
+
+class ParallelLoader:
+    """
+    Parses files in a process pool and yields (path, docs) as each file finishes.
+    PDFs longer than pages_per_task pages are split into page ranges parsed by
+    different workers and reassembled in page order. At most max_pending files
+    or page ranges are parsed at once, so memory does not grow with the number
+    of files. workers <= 1 parses in-process.
+    """
+    def __init__(self, workers=None, max_pending=None, pages_per_task=None):
+        self.workers = workers or int(os.getenv("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.max_pending = max_pending or 2 * self.workers
+        self.pages_per_task = pages_per_task or int(os.getenv("INGEST_PAGES_PER_TASK", "16"))
+
+    def _pool(self):
+        # Not fork: the caller already runs threads (ingestion pipeline, embedding batcher) and
+        # may hold torch's thread pools, and a forked child can inherit their locks held
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def _tasks(self, path, loader):
+        """Page ranges of a long PDF, else the whole file (pages=None)"""
+        if hasattr(loader, "page_count"):
+            try:
+                count = loader.page_count(path)
+            except Exception:
+                count = 0     # let the worker report the error
+            if count > self.pages_per_task:
+                return [(start, start + self.pages_per_task) for start in range(0, count, self.pages_per_task)]
+        return [None]
+
+    def load(self, items):
+        """items: iterable of (path, loader); results come in completion order"""
+        if self.workers <= 1:
+            for path, loader in items:
+                try:
+                    yield path, loader.load_file(path)
+                except Exception as e:
+                    print(f"❌ Error loading {path.name}: {e}")
+            return
+
+        items = iter(items)
+        with self._pool() as pool:
+            pending = {}       # future -> (path, range index)
+            files = {}         # path -> [docs of each range (None until parsed), ranges left, failed]
+            queued = deque()   # (path, loader, range index, pages) not submitted yet
+
+            def fill():
+                while len(pending) < self.max_pending:
+                    if not queued:
+                        item = next(items, None)
+                        if item is None:
+                            return
+                        path, loader = item
+                        ranges = self._tasks(path, loader)
+                        files[path] = [[None] * len(ranges), len(ranges), False]
+                        queued.extend((path, loader, i, pages) for i, pages in enumerate(ranges))
+                    path, loader, index, pages = queued.popleft()
+                    pending[pool.submit(_load_in_worker, loader, path, pages)] = (path, index)
+
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, index = pending.pop(future)
+                    entry = files[path]
+                    try:
+                        entry[0][index] = future.result()
+                    except Exception as e:
+                        print(f"❌ Error loading {path.name}: {e}")
+                        entry[2] = True
+                    entry[1] -= 1
+                    if entry[1] == 0:
+                        del files[path]
+                        # A file with a failed range is skipped whole, like a file that failed to parse
+                        if not entry[2]:
+                            yield path, [doc for docs in entry[0] for doc in docs]
+                fill()
+
+
 class DataLoader:
     def __init__(self, pdf_dir="data/pdf", txt_dir="data/text_files"):
         self.pdf_loader = PDFLoader(pdf_dir)
         self.txt_loader = TextLoader(txt_dir)
 
+    def files(self):
+        """
+        List every source file with the loader that can parse it
+        """
+        return ([(f, self.pdf_loader) for f in self.pdf_loader.files()] +
+                [(f, self.txt_loader) for f in self.txt_loader.files()])
+
+    def iter_documents(self, workers=None):
+        """
+        Generator over every document, parsed in parallel (see ParallelLoader)
+        """
+        for _, docs in ParallelLoader(workers).load(self.files()):
+            yield from docs
+
     def load_all(self):
         print("\n📥 Loading all documents...")
         
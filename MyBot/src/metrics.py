@@ -0,0 +1,249 @@
+"""
+In-process metrics and per-request tracing.
+
+Counters and histograms are rendered in the Prometheus text format on
+/metrics. span() times a pipeline stage into STAGE_SECONDS and, when a trace
+is active in the current context (one per HTTP request), also into that
+trace, which main.py turns into a Server-Timing header. Recording is a
+perf_counter() pair, a bisect and a short lock, so it stays off the profile.
+
+With several worker processes every process exposes its own numbers.
+"""
+
+import contextvars
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels[n] for n in self.labelnames), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}_total{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}           # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, {'le': _number(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """
+        collect() is called at scrape time and returns (name, type, help, samples)
+        tuples, samples being (labels dict, value) pairs; for values that already
+        live elsewhere (cache statistics, queue sizes)
+        """
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"⚠️  Metrics collector failed: {e}")
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                sample = f"{name}_total" if kind == "counter" else name
+                for labels, value in samples:
+                    lines.append(f"{sample}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "medibot_request_seconds", "HTTP request latency", ["endpoint", "status"])
+STAGE_SECONDS = REGISTRY.histogram(
+    "medibot_stage_seconds", "Time spent in one pipeline stage call", ["stage"])
+MODEL_ATTEMPT_SECONDS = REGISTRY.histogram(
+    "medibot_model_attempt_seconds", "Upstream model attempt latency", ["model", "outcome"])
+FALLBACK_DEPTH = REGISTRY.histogram(
+    "medibot_model_fallback_depth", "Model attempts started per question that reached the model chain",
+    ["outcome"], buckets=(1, 2, 3, 4, 5, 6, 7))
+EMBEDDING_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "medibot_embedding_queue_wait_seconds", "Time a text waited for its micro-batch to start",
+    ["model"], buckets=QUEUE_WAIT_BUCKETS)
+EMBEDDING_BATCH_SIZE = REGISTRY.histogram(
+    "medibot_embedding_batch_size", "Texts per micro-batched encode call", ["model"], buckets=BATCH_SIZE_BUCKETS)
+ANSWERS = REGISTRY.counter(
+    "medibot_answers", "Answers by where they came from", ["source"])
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "medibot_upstream_errors", "Failed upstream model attempts", ["model", "kind"])
+
+
+def error_kind(error):
+    """Coarse label for an upstream failure: http_<status>, timeout, connection or error"""
+    text = str(error)
+    status = re.search(r"\b([45]\d\d)\b", text)
+    if status:
+        return f"http_{status.group(1)}"
+    lowered = text.lower()
+    if "timed out" in lowered or "timeout" in lowered:
+        return "timeout"
+    if "connect" in lowered:
+        return "connection"
+    return "error"
+
+
+# Tracing
+
+class Trace:
+    """Stage timings of one request (appended from worker threads too)"""
+    __slots__ = ("name", "started", "spans")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def add(self, stage, seconds):
+        self.spans.append((stage, seconds))
+
+    def totals(self):
+        totals = {}
+        for stage, seconds in list(self.spans):
+            total, count = totals.get(stage, (0.0, 0))
+            totals[stage] = (total + seconds, count + 1)
+        return totals
+
+    def server_timing(self):
+        """Server-Timing header value: per-stage total ms (and call count when > 1)"""
+        parts = []
+        for stage, (total, count) in self.totals().items():
+            desc = f';desc="{count} calls"' if count > 1 else ""
+            parts.append(f"{stage};dur={total * 1000:.1f}{desc}")
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current_trace = contextvars.ContextVar("medibot_trace", default=None)
+
+
+def start_trace(name):
+    """Begin a trace for the current request; returns a token for end_trace()"""
+    trace = Trace(name)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    try:
+        _current_trace.reset(token)
+    except ValueError:
+        # Ended from a different context than it started in (e.g. streamed responses)
+        _current_trace.set(None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def record(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def submit(executor, fn, *args):
+    """executor.submit() that carries the caller's trace into the worker thread"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
@@ -0,0 +1,446 @@
+import json
+import mmap
+import os
+import threading
+import numpy as np
+
+from filelock import FileLock
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+# Rows scored per matmul in exact search (bounds the int8 -> float32 temporaries)
+SEARCH_BLOCK = 65536
+# Queries scored together in query_many
+QUERY_BLOCK = 64
+# The newest segment is merged into the one before it while that one is at most this many times larger
+MERGE_FACTOR = 2
+# Attempts to load a manifest whose segments a concurrent compaction may have removed
+LOAD_ATTEMPTS = 5
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors):
+    """Symmetric per-row int8 quantization: row ≈ q8 * scale"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    q8 = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return q8, scales.astype(np.float32)
+
+
+def _write_atomic(path, write, mode="wb"):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class _Segment:
+    """
+    One immutable batch of rows: memory-mapped vectors, the ids, and the
+    documents/metadata as JSON lines read on demand. Only the tombstones
+    (live) change, by copy.
+    """
+    __slots__ = ("id", "ids", "vectors", "scales", "docs", "offsets", "live", "count", "hnsw", "_positions")
+
+    def __init__(self, segment_id, ids, vectors, scales, docs, offsets, live, hnsw=None):
+        self.id = segment_id
+        self.ids = ids
+        self.vectors = vectors
+        self.scales = scales
+        self.docs = docs
+        self.offsets = offsets
+        self.live = live
+        self.count = int(live.sum())
+        self.hnsw = hnsw
+        self._positions = None
+
+    @property
+    def positions(self):
+        """Row of each id, built on first use (writers only)"""
+        if self._positions is None:
+            self._positions = {cid: row for row, cid in enumerate(self.ids)}
+        return self._positions
+
+    def line(self, row):
+        return self.docs[int(self.offsets[row]):int(self.offsets[row + 1])]
+
+    def record(self, row):
+        record = json.loads(self.line(row))
+        return record["document"], record["metadata"]
+
+    def dequantized(self, rows):
+        if self.scales is None:
+            return np.asarray(self.vectors[rows], dtype=np.float32)
+        return self.vectors[rows].astype(np.float32) * self.scales[rows, None]
+
+    def without(self, rows):
+        """Copy with rows tombstoned (shares the mapped files and the hnsw graph)"""
+        live = self.live.copy()
+        live[rows] = False
+        if self.hnsw is not None:
+            for row in np.flatnonzero(self.live & ~live):
+                self.hnsw.mark_deleted(int(row))
+        segment = _Segment(self.id, self.ids, self.vectors, self.scales, self.docs, self.offsets, live, self.hnsw)
+        segment._positions = self._positions
+        return segment
+
+
+class _Snapshot:
+    """The segments of one manifest, with its tombstones applied"""
+    __slots__ = ("manifest", "segments", "stamp", "count")
+
+    def __init__(self, manifest, segments, stamp):
+        self.manifest = manifest
+        self.segments = segments
+        self.stamp = stamp
+        self.count = sum(s.count for s in segments)
+
+
+class NumpyBackend:
+    """
+    Vector backend on plain .npy files opened with mmap_mode="r".
+    Every process that opens the same directory shares the vector pages through
+    the OS page cache. Embeddings are stored L2-normalized, as float32 or
+    per-row int8 with a float32 scale, and searched by inner product (exact
+    blocked matmul, or an hnswlib graph per segment when index="hnsw" and
+    hnswlib is installed).
+
+    The store is append-only. Each upsert writes one new segment (vectors, ids
+    and documents/metadata as JSON lines) and publishes it by atomically
+    replacing a small manifest that lists the segments; deletes and replaced
+    ids append (segment, row) tombstones to a log whose committed length the
+    manifest records. Writers serialize across processes on a file lock.
+    Small trailing segments are merged log-structured style (each row is
+    rewritten O(log N) times) and a full compaction starts a new epoch once
+    tombstones outnumber live rows. Readers stat() the manifest before each
+    query and only open new segments and read new tombstones.
+    """
+    def __init__(self, path, name, dtype="float32", index="exact"):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        if index == "hnsw" and hnswlib is None:
+            print("⚠️  hnswlib not installed, using exact search")
+            index = "exact"
+
+        self.path = path
+        self.name = name
+        self.dtype = dtype
+        self.index = index
+        self.manifest_path = os.path.join(path, f"{name}.manifest.json")
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(path, f"{name}.lock"))
+        self._snapshot = _Snapshot(self._empty_manifest(), [], None)
+        self.refresh()
+
+    # Loading
+
+    @staticmethod
+    def _empty_manifest(epoch=0, next_segment=0):
+        return {"version": 2, "epoch": epoch, "next_segment": next_segment, "segments": [], "tombstones": 0}
+
+    def _file(self, segment_id, suffix):
+        return os.path.join(self.path, f"{self.name}.seg{segment_id}.{suffix}")
+
+    def _tombstone_path(self, epoch):
+        return os.path.join(self.path, f"{self.name}.{epoch}.tombstones")
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def refresh(self):
+        """Catch up with segments and tombstones published by other writers (or processes). Returns True on change."""
+        if self._stamp() == self._snapshot.stamp:
+            return False
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        """refresh() for a caller holding self._lock"""
+        for attempt in range(LOAD_ATTEMPTS):
+            stamp = self._stamp()
+            if stamp == self._snapshot.stamp:
+                return False
+            try:
+                self._snapshot = self._load(stamp, self._snapshot)
+                return True
+            except FileNotFoundError:
+                # A compaction removed segments of the manifest we read; pick up the next one
+                if attempt == LOAD_ATTEMPTS - 1:
+                    raise
+        return False
+
+    def _load(self, stamp, old):
+        if stamp is None:
+            return _Snapshot(self._empty_manifest(), [], None)
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        # Within an epoch segments are immutable and the tombstone log only grows
+        same_epoch = manifest["epoch"] == old.manifest["epoch"]
+        known = {s.id: s for s in old.segments} if same_epoch else {}
+        segments = [known.get(sid) or self._open_segment(sid) for sid in manifest["segments"]]
+
+        start = old.manifest["tombstones"] if same_epoch else 0
+        end = manifest["tombstones"]
+        if end > start:
+            with open(self._tombstone_path(manifest["epoch"]), "rb") as f:
+                f.seek(start)
+                pairs = np.frombuffer(f.read(end - start), dtype=np.int64).reshape(-1, 2)
+            for i, segment in enumerate(segments):
+                rows = pairs[pairs[:, 0] == segment.id, 1]
+                if len(rows):
+                    segments[i] = segment.without(rows)
+
+        return _Snapshot(manifest, segments, stamp)
+
+    def _open_segment(self, segment_id):
+        with open(self._file(segment_id, "json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        vectors = np.load(self._file(segment_id, "vectors.npy"), mmap_mode="r")
+        scales = np.load(self._file(segment_id, "scales.npy"), mmap_mode="r") if info["dtype"] == "int8" else None
+        offsets = np.load(self._file(segment_id, "offsets.npy"), mmap_mode="r")
+        with open(self._file(segment_id, "docs.jsonl"), "rb") as f:
+            docs = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        live = np.ones(len(info["ids"]), dtype=bool)
+        segment = _Segment(segment_id, info["ids"], vectors, scales, docs, offsets, live)
+        if self.index == "hnsw":
+            segment.hnsw = self._load_hnsw(segment)
+        return segment
+
+    def _load_hnsw(self, segment):
+        path = self._file(segment.id, "hnsw")
+        graph = hnswlib.Index(space="ip", dim=segment.vectors.shape[1])
+        if os.path.exists(path):
+            graph.load_index(path, max_elements=len(segment.live))
+        else:
+            # Written by a backend without hnsw enabled; build (and keep) the graph now
+            graph = self._build_hnsw(segment.dequantized(slice(None)))
+            graph.save_index(path)
+        return graph
+
+    @staticmethod
+    def _build_hnsw(vectors):
+        graph = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        graph.init_index(max_elements=len(vectors), ef_construction=200, M=16)
+        graph.add_items(vectors, np.arange(len(vectors)))
+        return graph
+
+    # Writing (callers hold self._lock and the file lock, with the snapshot refreshed)
+
+    def _write_segment(self, segment_id, ids, lines, vectors):
+        """Write normalized float32 vectors and their JSON lines as a segment (not yet published)"""
+        stored, scales = quantize(vectors) if self.dtype == "int8" else (vectors, None)
+        offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+        np.cumsum([len(line) for line in lines], out=offsets[1:])
+
+        _write_atomic(self._file(segment_id, "vectors.npy"), lambda f: np.save(f, stored))
+        if scales is not None:
+            _write_atomic(self._file(segment_id, "scales.npy"), lambda f: np.save(f, scales))
+        _write_atomic(self._file(segment_id, "offsets.npy"), lambda f: np.save(f, offsets))
+        _write_atomic(self._file(segment_id, "docs.jsonl"), lambda f: f.writelines(lines))
+        if self.index == "hnsw":
+            self._build_hnsw(vectors).save_index(self._file(segment_id, "hnsw"))
+        # Written last: a segment without its .json is an unfinished write and never opened
+        _write_atomic(self._file(segment_id, "json"), lambda f: json.dump({"dtype": self.dtype, "ids": ids}, f),
+                      mode="w")
+
+    def _publish(self, manifest, tombstones=()):
+        """Append tombstones to the log and atomically replace the manifest"""
+        path = self._tombstone_path(manifest["epoch"])
+        if tombstones:
+            with open(path, "ab") as f:
+                # Drop tombstones of a writer that died before publishing
+                f.truncate(manifest["tombstones"])
+                f.write(np.asarray(tombstones, dtype=np.int64).tobytes())
+                manifest["tombstones"] = f.tell()
+        _write_atomic(self.manifest_path, lambda f: json.dump(manifest, f), mode="w")
+
+        dropped = {s.id for s in self._snapshot.segments} - set(manifest["segments"])
+        old_epoch = self._snapshot.manifest["epoch"]
+        self._refresh()
+        # Processes still mapping the dropped files keep their pages until they refresh
+        for segment_id in dropped:
+            for suffix in ("json", "vectors.npy", "scales.npy", "offsets.npy", "docs.jsonl", "hnsw"):
+                self._remove(self._file(segment_id, suffix))
+        if old_epoch != manifest["epoch"]:
+            self._remove(self._tombstone_path(old_epoch))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _next_manifest(self):
+        manifest = dict(self._snapshot.manifest)
+        manifest["segments"] = list(manifest["segments"])
+        return manifest
+
+    def _merge(self, segment_id, segments):
+        """Write the live rows of segments as segment segment_id; returns False if none is live"""
+        ids, lines, parts = [], [], []
+        for segment in segments:
+            rows = np.flatnonzero(segment.live)
+            if len(rows):
+                ids.extend(segment.ids[r] for r in rows)
+                lines.extend(segment.line(r) for r in rows)
+                parts.append(segment.dequantized(rows))
+        if ids:
+            self._write_segment(segment_id, ids, lines, np.concatenate(parts))
+        return bool(ids)
+
+    def _compact(self):
+        """Merge small trailing segments; start a new epoch when tombstones outnumber live rows"""
+        snap = self._snapshot
+        segment_id = snap.manifest["next_segment"]
+        if sum(len(s.live) for s in snap.segments) > 2 * snap.count:
+            manifest = self._empty_manifest(snap.manifest["epoch"] + 1, segment_id + 1)
+            if self._merge(segment_id, snap.segments):
+                manifest["segments"] = [segment_id]
+            self._publish(manifest)
+            return
+
+        segments = snap.segments
+        tail = 1
+        while tail < len(segments) and len(segments[-tail - 1].live) <= MERGE_FACTOR * sum(
+                len(s.live) for s in segments[-tail:]):
+            tail += 1
+        if tail > 1:
+            manifest = self._next_manifest()
+            manifest["next_segment"] = segment_id + 1
+            kept = manifest["segments"][:-tail]
+            manifest["segments"] = kept + [segment_id] if self._merge(segment_id, segments[-tail:]) else kept
+            self._publish(manifest)
+
+    def _tombstones(self, ids):
+        """(segment, row) of the live rows carrying ids"""
+        found = []
+        for segment in self._snapshot.segments:
+            positions = segment.positions
+            for cid in ids:
+                row = positions.get(cid)
+                if row is not None and segment.live[row]:
+                    found.append((segment.id, row))
+        return found
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        if not len(ids):
+            return
+        vectors = normalize(embeddings)
+        # A repeated id keeps its last row
+        rows = sorted({cid: i for i, cid in enumerate(ids)}.values())
+        ids = [ids[i] for i in rows]
+        lines = [json.dumps({"document": documents[i], "metadata": metadatas[i]}).encode("utf-8") + b"\n"
+                 for i in rows]
+
+        with self._lock, self._file_lock:
+            self._refresh()
+            manifest = self._next_manifest()
+            segment_id = manifest["next_segment"]
+            self._write_segment(segment_id, ids, lines, vectors[rows])
+            manifest["next_segment"] += 1
+            manifest["segments"].append(segment_id)
+            self._publish(manifest, self._tombstones(ids))
+            self._compact()
+
+    def delete(self, ids):
+        with self._lock, self._file_lock:
+            self._refresh()
+            tombstones = self._tombstones(set(ids))
+            if tombstones:
+                self._publish(self._next_manifest(), tombstones)
+                self._compact()
+
+    def reset(self):
+        with self._lock, self._file_lock:
+            self._refresh()
+            snap = self._snapshot
+            self._publish(self._empty_manifest(snap.manifest["epoch"] + 1, snap.manifest["next_segment"]))
+
+    # Reading
+
+    def count(self):
+        return self._snapshot.count
+
+    def _exact(self, segment, queries, k):
+        """Top-k rows and scores of a segment per query for a (n_queries, dim) matrix"""
+        scores = np.empty((len(segment.live), len(queries)), dtype=np.float32)
+        for start in range(0, len(scores), SEARCH_BLOCK):
+            block = segment.vectors[start:start + SEARCH_BLOCK]
+            part = block @ queries.T
+            if segment.scales is not None:
+                part *= segment.scales[start:start + len(block), None]
+            scores[start:start + len(block)] = part
+        scores[~segment.live] = -np.inf
+
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        else:
+            top = np.broadcast_to(np.arange(len(scores))[:, None], scores.shape)
+        return top.T, np.take_along_axis(scores, top, axis=0).T
+
+    def _search(self, segment, queries, k):
+        """(rows, scores), each (n_queries, k), of the k best live rows of one segment"""
+        if segment.hnsw is not None:
+            segment.hnsw.set_ef(max(50, 4 * k))
+            rows, distances = segment.hnsw.knn_query(queries, k=k)
+            return rows, 1.0 - distances
+        rows, scores = [], []
+        # Bound the (rows x queries) score matrix
+        for start in range(0, len(queries), QUERY_BLOCK):
+            r, s = self._exact(segment, queries[start:start + QUERY_BLOCK], k)
+            rows.append(r)
+            scores.append(s)
+        return np.concatenate(rows), np.concatenate(scores)
+
+    def query(self, vector, k=3):
+        return self.query_many(normalize(vector), k)[0]
+
+    def query_many(self, vectors, k=3):
+        """One search for a batch of query vectors; returns one chroma-style result per query"""
+        snap = self._snapshot
+        queries = normalize(vectors)
+        k = min(k, snap.count)
+        if k == 0:
+            return [{"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]} for _ in queries]
+
+        segments, rows, scores = [], [], []
+        for segment in snap.segments:
+            if segment.count:
+                r, s = self._search(segment, queries, min(k, segment.count))
+                segments.append(np.full(r.shape, len(rows)))
+                rows.append(r)
+                scores.append(s)
+        owners = np.concatenate(segments, axis=1)
+        rows = np.concatenate(rows, axis=1)
+        scores = np.concatenate(scores, axis=1)
+        best = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        live = [s for s in snap.segments if s.count]
+
+        results = []
+        for q, order in enumerate(best):
+            hits = [(live[owners[q, j]], int(rows[q, j])) for j in order]
+            records = [segment.record(row) for segment, row in hits]
+            results.append({
+                "ids": [[segment.ids[row] for segment, row in hits]],
+                "documents": [[document for document, _ in records]],
+                "metadatas": [[metadata for _, metadata in records]],
+                "distances": [[float(1.0 - scores[q, j]) for j in order]]
+            })
+        return results
@@ -1,22 +1,168 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from cache import TTLCache, normalize_query
+import metrics
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuse ranked lists of (id, doc) with RRF: score = sum of 1 / (k + rank).
+    Returns docs ordered by fused score; ties keep first-seen order.
+    """
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, (doc_id, doc) in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(doc_id, doc)
+    return [docs[i] for i in sorted(scores, key=scores.get, reverse=True)]
+
+
 class Retriever:
-    def __init__(self, store, embedder):
+    """
+    Dense top-k retrieval, optionally fused with a BM25 index (hybrid mode).
+    With a sparse index both searches fetch `candidates` hits each, run in
+    parallel, and are merged with reciprocal rank fusion before cutting to k.
+    """
+    def __init__(self, store, embedder, k=3, cache_size=None, cache_ttl=None,
+                 sparse=None, candidates=None, rrf_k=None):
         self.store = store
         self.embedder = embedder
+        self.k = k
+        self.sparse = sparse
+        self.candidates = candidates or int(os.getenv("RETRIEVER_CANDIDATES", "10"))
+        self.rrf_k = rrf_k or int(os.getenv("RETRIEVER_RRF_K", "60"))
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bm25") if sparse is not None else None
+
+        cache_size = cache_size or int(os.getenv("RETRIEVER_CACHE_SIZE", "512"))
+        cache_ttl = cache_ttl or float(os.getenv("RETRIEVER_CACHE_TTL", "900"))
+        # Query vectors only depend on the text, results also depend on the store contents
+        self.embedding_cache = TTLCache(cache_size, cache_ttl)
+        self.result_cache = TTLCache(cache_size, cache_ttl)
+        if hasattr(store, "subscribe"):
+            store.subscribe(self.result_cache.clear)
+
+    def embed_query(self, query: str):
+        key = normalize_query(query)
+        qvec = self.embedding_cache.get(key)
+        if qvec is None:
+            with metrics.span("query_embed"):
+                qvec = self.embedder.encode_query(query)
+            self.embedding_cache.set(key, qvec)
+        return qvec
 
     def retrieve(self, query: str):
         if not query or not query.strip():
             return []
-            
+
         try:
-            qvec = self.embedder.encode([query])[0]
-            result = self.store.query(qvec, k=3)
-
-            docs = []
-            if result["documents"] and result["documents"][0]:
-                for t, m in zip(result["documents"][0], result["metadatas"][0]):
-                    docs.append({"text": t, "metadata": m})
-            
+            key = normalize_query(query)
+            docs = self.result_cache.get(key)
+            if docs is not None:
+                return docs
+
+            generation = self.result_cache.generation
+            if self.sparse is None:
+                docs = [doc for _, doc in self._dense(query, self.k)]
+            else:
+                sparse = metrics.submit(self._pool, self._sparse, query, self.candidates)
+                try:
+                    dense = self._dense(query, self.candidates)
+                except Exception as e:
+                    # Exact-term hits are still useful when the embedder is down
+                    print(f"❌ Error in dense search: {e}")
+                    dense = []
+                docs = reciprocal_rank_fusion([dense, sparse.result()], self.rrf_k)[:self.k]
+
+            if docs:
+                self.result_cache.set(key, docs, generation)
             return docs
         except Exception as e:
             print(f"❌ Error in retriever: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    def retrieve_many(self, queries):
+        """
+        Batch retrieve() for offline jobs: cache misses are embedded in one
+        vectorized pass and searched with one multi-query store call (BM25 runs
+        alongside in the pool). Returns one docs list per query, in input order.
+        """
+        results = [[] for _ in queries]
+        misses = {}
+        for i, query in enumerate(queries):
+            if not query or not query.strip():
+                continue
+            key = normalize_query(query)
+            docs = self.result_cache.get(key)
+            if docs is not None:
+                results[i] = docs
+            else:
+                misses.setdefault(key, []).append(i)
+        if not misses:
+            return results
+
+        try:
+            generation = self.result_cache.generation
+            keys = list(misses)
+            texts = [queries[misses[key][0]] for key in keys]
+            k = self.k if self.sparse is None else self.candidates
+
+            sparse = [metrics.submit(self._pool, self._sparse, text, k) for text in texts] if self.sparse is not None else None
+            try:
+                dense = [self._ranked(r) for r in self.store.query_many(self._embed_many(keys, texts), k=k)]
+            except Exception as e:
+                if sparse is None:
+                    raise
+                print(f"❌ Error in dense search: {e}")
+                dense = [[] for _ in keys]
+
+            for n, key in enumerate(keys):
+                if sparse is None:
+                    docs = [doc for _, doc in dense[n]]
+                else:
+                    docs = reciprocal_rank_fusion([dense[n], sparse[n].result()], self.rrf_k)[:self.k]
+                if docs:
+                    self.result_cache.set(key, docs, generation)
+                for i in misses[key]:
+                    results[i] = docs
+        except Exception as e:
+            print(f"❌ Error in retriever: {e}")
+        return results
+
+    def _embed_many(self, keys, texts):
+        vectors = [self.embedding_cache.get(key) for key in keys]
+        todo = [n for n, v in enumerate(vectors) if v is None]
+        if todo:
+            with metrics.span("query_embed"):
+                encoded = self.embedder.encode_queries([texts[n] for n in todo])
+            for n, vector in zip(todo, encoded):
+                vectors[n] = vector
+                self.embedding_cache.set(keys[n], vector)
+        return np.stack(vectors)
+
+    def _dense(self, query, k):
+        qvec = self.embed_query(query)
+        return self._ranked(self.store.query(qvec, k=k))
+
+    def _ranked(self, result):
+        ranked = []
+        if result["documents"] and result["documents"][0]:
+            ids = result.get("ids") or [[None] * len(result["documents"][0])]
+            for i, t, m in zip(ids[0], result["documents"][0], result["metadatas"][0]):
+                ranked.append((i or t, {"text": t, "metadata": m}))
+        return ranked
+
+    def _sparse(self, query, k):
+        try:
+            with metrics.span("bm25_search"):
+                hits = self.sparse.search(query, k)
+            return [(i, {"text": t, "metadata": m}) for i, t, m, _ in hits]
+        except Exception as e:
+            print(f"❌ Error in BM25 search: {e}")
+            return []
+
+    def cache_stats(self):
+        return {
+            "embeddings": self.embedding_cache.stats(),
+            "results": self.result_cache.stats()
+        }
@@ -0,0 +1,117 @@
+import threading
+import time
+
+
+class ModelStats:
+    def __init__(self):
+        self.attempts = 0
+        self.successes = 0
+        self.validated = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency_ewma = None
+        self.open_until = 0.0
+        self.trial_started = None    # half-open: when the single trial call was handed out
+
+
+class ModelScoreboard:
+    """
+    Per-model success rate, validation pass rate and latency EWMA.
+    ordered() ranks the fallback chain by score and skips models whose circuit
+    breaker is open (failure_threshold failures in a row, for cooldown seconds).
+    Once the cool-down expires the circuit is half-open: acquire() hands out a
+    single trial call and refuses the model to everyone else until that call
+    records its result (or trial_timeout passes without one). Success closes
+    the circuit, another failure reopens it.
+    """
+    def __init__(self, models, failure_threshold=3, cooldown=60.0, alpha=0.3, latency_scale=10.0,
+                 trial_timeout=60.0):
+        self.models = list(models)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.trial_timeout = trial_timeout
+        self.alpha = alpha
+        self.latency_scale = latency_scale
+        self.stats = {m: ModelStats() for m in self.models}
+        self._lock = threading.Lock()
+
+    def record(self, model, latency, ok, validated=False):
+        """ok: the call returned a response; validated: it passed the quality check"""
+        with self._lock:
+            s = self.stats.setdefault(model, ModelStats())
+            s.trial_started = None
+            s.attempts += 1
+            s.latency_ewma = latency if s.latency_ewma is None \
+                else self.alpha * latency + (1 - self.alpha) * s.latency_ewma
+
+            if ok:
+                s.successes += 1
+                s.validated += int(validated)
+                s.consecutive_failures = 0
+                s.open_until = 0.0
+            else:
+                s.failures += 1
+                s.consecutive_failures += 1
+                if s.consecutive_failures >= self.failure_threshold:
+                    s.open_until = time.monotonic() + self.cooldown
+                    print(f"🚫 Circuit open for {model} ({s.consecutive_failures} failures in a row)")
+
+    def score(self, s):
+        # Laplace-smoothed validated-answer rate (untried models start at 0.5), slowed by latency
+        pass_rate = (s.validated + 1) / (s.attempts + 2)
+        return pass_rate / (1 + (s.latency_ewma or 0.0) / self.latency_scale)
+
+    def _state(self, s, now):
+        if s.open_until > now:
+            return "open"
+        if s.open_until:
+            # Cool-down over but no success since: only a trial call may go through
+            trial = s.trial_started is not None and now - s.trial_started < self.trial_timeout
+            return "trial" if trial else "half_open"
+        return "closed"
+
+    def ordered(self):
+        """Models that may be tried now, best first (acquire() each before calling it)"""
+        now = time.monotonic()
+        with self._lock:
+            available = [m for m in self.models if self._state(self.stats[m], now) in ("closed", "half_open")]
+            # sorted() is stable, so ties keep the configured order
+            return sorted(available, key=lambda m: -self.score(self.stats[m]))
+
+    def acquire(self, model):
+        """
+        Claim a call to model. Always granted while the circuit is closed; when
+        half-open only the first caller gets the trial, until it records a result.
+        """
+        now = time.monotonic()
+        with self._lock:
+            s = self.stats.setdefault(model, ModelStats())
+            state = self._state(s, now)
+            if state == "half_open":
+                s.trial_started = now
+                print(f"🔁 Trial call for {model} (circuit half-open)")
+                return True
+            return state == "closed"
+
+    def release(self, model):
+        """Give back a trial claimed by acquire() that was never made"""
+        with self._lock:
+            s = self.stats.get(model)
+            if s is not None:
+                s.trial_started = None
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                m: {
+                    "attempts": s.attempts,
+                    "success_rate": round(s.successes / s.attempts, 3) if s.attempts else None,
+                    "validation_rate": round(s.validated / s.successes, 3) if s.successes else None,
+                    "latency_ewma": round(s.latency_ewma, 3) if s.latency_ewma is not None else None,
+                    "consecutive_failures": s.consecutive_failures,
+                    "circuit": "half_open" if self._state(s, now) == "trial" else self._state(s, now),
+                    "score": round(self.score(s), 4)
+                }
+                for m, s in self.stats.items()
+            }
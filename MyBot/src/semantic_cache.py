@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import numpy as np
+from filelock import FileLock
+
+
+def context_fingerprint(context: str) -> str:
+    """
+    Order-insensitive hash of the retrieved context, so paraphrases that pull
+    the same chunks in a different order share cache entries
+    """
+    parts = sorted(p.strip() for p in (context or "").split("\n\n") if p.strip())
+    return hashlib.sha1("\n\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class SemanticCache:
+    """
+    Validated answers indexed by the embedding of the question that produced them.
+    A lookup hits when a stored question with the same context fingerprint has
+    cosine similarity >= threshold with the new one. Least recently used
+    entries are evicted past maxsize, entries older than ttl are dropped.
+
+    Persistence is an append-only log (answers.jsonl): put() appends one line
+    under a cross-process file lock, so worker processes sharing the directory
+    add to the same log instead of overwriting each other. Once the log holds
+    more than twice maxsize lines it is compacted to the newest live entries.
+    Each process loads the log at startup.
+    """
+    def __init__(self, path="data/semantic_cache", threshold=0.92, maxsize=1000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.entries = []
+        self.vectors = None
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(path, "answers.lock"))
+        self._load()
+
+    @property
+    def _log_file(self):
+        return os.path.join(self.path, "answers.jsonl")
+
+    @staticmethod
+    def _encode_record(entry, vector):
+        record = {k: entry[k] for k in ("id", "query", "fingerprint", "answer", "created")}
+        record["vector"] = base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+        return json.dumps(record) + "\n"
+
+    def _read_log(self, now):
+        """Live records of the log, newest maxsize, as (entries, vectors)"""
+        records = {}
+        with open(self._log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    vector = np.frombuffer(base64.b64decode(record.pop("vector")), dtype=np.float32)
+                except Exception:
+                    continue    # torn or corrupt line
+                if now - record["created"] < self.ttl:
+                    records[record["id"]] = (record, vector)
+
+        newest = sorted(records.values(), key=lambda rv: rv[0]["created"])[-self.maxsize:]
+        entries = [dict(r, last_used=r["created"]) for r, _ in newest]
+        vectors = np.stack([v for _, v in newest]) if newest else None
+        return entries, vectors
+
+    def _load(self):
+        if not os.path.exists(self._log_file) or self.maxsize <= 0:
+            return
+        try:
+            self.entries, self.vectors = self._read_log(time.time())
+            print(f"💾 Semantic cache loaded: {len(self.entries)} answers")
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable semantic cache: {e}")
+
+    def _append(self, entry, vector):
+        line = self._encode_record(entry, vector)
+        with self._file_lock:
+            with open(self._log_file, "a", encoding="utf-8") as f:
+                f.write(line)
+                size = f.tell()
+            # Records are about the same size (the vector dominates), so bytes track lines from every process
+            if size > 2 * self.maxsize * len(line):
+                self._compact()
+
+    def _compact(self):
+        """Rewrite the log with its live entries (caller holds the file lock)"""
+        entries, vectors = self._read_log(time.time())
+        tmp = f"{self._log_file}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry, vector in zip(entries, vectors if vectors is not None else []):
+                f.write(self._encode_record(entry, vector))
+        os.replace(tmp, self._log_file)
+
+    def _keep(self, keep):
+        self.entries = [e for e, k in zip(self.entries, keep) if k]
+        self.vectors = self.vectors[np.asarray(keep, dtype=bool)]
+
+    def _expire(self, now):
+        if self.ttl and self.entries:
+            keep = [now - e["created"] < self.ttl for e in self.entries]
+            if not all(keep):
+                self._keep(keep)
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query_embedding, fingerprint):
+        if query_embedding is None or self.maxsize <= 0:
+            return None
+
+        q = self._normalize(query_embedding)
+        now = time.time()
+        with self._lock:
+            if self.entries:
+                sims = self.vectors @ q
+                candidates = [i for i, e in enumerate(self.entries)
+                              if e["fingerprint"] == fingerprint and now - e["created"] < self.ttl]
+                if candidates:
+                    best = max(candidates, key=lambda i: sims[i])
+                    if sims[best] >= self.threshold:
+                        self.entries[best]["last_used"] = now
+                        self.hits += 1
+                        return self.entries[best]["answer"]
+            self.misses += 1
+            return None
+
+    def put(self, query, query_embedding, fingerprint, answer):
+        if query_embedding is None or self.maxsize <= 0:
+            return
+
+        q = self._normalize(query_embedding)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = {"id": uuid.uuid4().hex, "query": query, "fingerprint": fingerprint,
+                     "answer": answer, "created": now, "last_used": now}
+            self.entries.append(entry)
+            self.vectors = q[None, :] if self.vectors is None or not len(self.vectors) \
+                else np.vstack([self.vectors, q])
+
+            if len(self.entries) > self.maxsize:
+                oldest = min(range(len(self.entries)), key=lambda i: self.entries[i]["last_used"])
+                self._keep([i != oldest for i in range(len(self.entries))])
+
+        # O(1) append outside the in-memory lock; lookups never wait on disk
+        try:
+            self._append(entry, q)
+        except Exception as e:
+            print(f"⚠️  Could not persist semantic cache: {e}")
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0
+        }
@@ -1,47 +1,172 @@
 import uuid
-import chromadb
 import os
+import numpy as np
+import metrics
+
+
+def empty_result():
+    return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+
+
+class ChromaBackend:
+    """
+    Vector backend on a chromadb PersistentClient collection
+    """
+    def __init__(self, path, name):
+        import chromadb
+
+        self.name = name
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.get_or_create_collection(name)
+
+    def refresh(self):
+        # Chroma reads through to its own storage on every call
+        return False
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        # chromadb 0.5 validates embeddings as Python lists
+        self.collection.upsert(ids=ids, documents=documents,
+                               embeddings=embeddings.tolist(), metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def count(self):
+        return self.collection.count()
+
+    def reset(self):
+        self.client.delete_collection(self.name)
+        self.collection = self.client.get_or_create_collection(self.name)
+
+    def query(self, vector, k=3):
+        n = self.collection.count()
+        if n == 0:
+            return empty_result()
+        return self.collection.query(query_embeddings=[vector.tolist()], n_results=min(k, n))
+
+    def query_many(self, vectors, k=3):
+        n = self.collection.count()
+        if n == 0:
+            return [empty_result() for _ in vectors]
+        result = self.collection.query(query_embeddings=vectors.tolist(), n_results=min(k, n))
+        # Split the batched response into one single-query result per input
+        return [{key: [result[key][i]] for key in ("ids", "documents", "metadatas", "distances") if result.get(key)}
+                for i in range(len(vectors))]
+
+
+def make_backend(path, name, backend=None):
+    """
+    Build the backend named by VECTOR_BACKEND (chroma | numpy).
+    The numpy backend also reads VECTOR_DTYPE (float32 | int8) and VECTOR_INDEX (exact | hnsw).
+    """
+    backend = (backend or os.getenv("VECTOR_BACKEND", "chroma")).lower()
+    if backend == "chroma":
+        return ChromaBackend(path, name)
+    if backend == "numpy":
+        from numpy_backend import NumpyBackend
+        return NumpyBackend(path, name,
+                            dtype=os.getenv("VECTOR_DTYPE", "float32"),
+                            index=os.getenv("VECTOR_INDEX", "exact"))
+    raise ValueError(f"Unknown vector backend: {backend}")
+
 
 class VectorStore:
-    def __init__(self, path="data/vector_store", name="medibot_docs"):
+    def __init__(self, path="data/vector_store", name="medibot_docs", backend=None):
         os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.name = name
+        self._listeners = []
         try:
-            self.client = chromadb.PersistentClient(path=path)
-            self.collection = self.client.get_or_create_collection(name)
-            print(f"📦 Vector store ready. Existing docs: {self.collection.count()}")
+            if backend is None or isinstance(backend, str):
+                backend = make_backend(path, name, backend)
+            self.backend = backend
+            print(f"📦 Vector store ready ({type(self.backend).__name__}). Existing docs: {self.backend.count()}")
         except Exception as e:
             print(f"❌ Error initializing vector store: {e}")
             raise
 
+    def subscribe(self, callback):
+        """
+        Register a callback fired after every write (used to invalidate caches)
+        """
+        self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            callback()
+
     def add(self, chunks, embeddings):
         if not chunks or len(chunks) == 0:
             print("⚠️  No chunks to add to vector store")
             return
-            
+
         try:
             ids = [uuid.uuid4().hex for _ in chunks]
-            docs = [c.page_content for c in chunks]
-            metas = [c.metadata for c in chunks]
-
-            self.collection.add(
-                ids=ids,
-                documents=docs,
-                embeddings=embeddings.tolist(),
-                metadatas=metas
-            )
-            print(f"✅ Added {len(chunks)} vectors → Total: {self.collection.count()}")
+            self.backend.upsert(ids, [c.page_content for c in chunks], [c.metadata for c in chunks], embeddings)
+            self._notify()
+            print(f"✅ Added {len(chunks)} vectors → Total: {self.backend.count()}")
         except Exception as e:
             print(f"❌ Error adding to vector store: {e}")
 
+    def upsert(self, ids, chunks, embeddings):
+        """
+        Insert or replace chunks under caller-supplied (deterministic) ids
+        """
+        if not chunks or len(chunks) == 0:
+            return
+
+        self.backend.upsert(list(ids), [c.page_content for c in chunks], [c.metadata for c in chunks], embeddings)
+        self._notify()
+        print(f"✅ Upserted {len(chunks)} vectors → Total: {self.backend.count()}")
+
+    def delete(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+
+        self.backend.delete(ids)
+        self._notify()
+        print(f"🗑️  Removed {len(ids)} vectors → Total: {self.backend.count()}")
+
+    def count(self):
+        return self.backend.count()
+
+    def reset(self):
+        """
+        Drop every vector in the collection and start from an empty one
+        """
+        self.backend.reset()
+        self._notify()
+        print("🧹 Vector store cleared")
+
+    def refresh(self):
+        """Pick up writes another process published; returns True on change"""
+        if self.backend.refresh():
+            self._notify()
+            return True
+        return False
+
     def query(self, vector, k=3):
-        if self.collection.count() == 0:
-            return {"documents": [[]], "metadatas": [[]]}
-            
         try:
-            return self.collection.query(
-                query_embeddings=[vector.tolist()],
-                n_results=min(k, self.collection.count())
-            )
+            # Another process may have published a new index since the last query
+            self.refresh()
+            with metrics.span("vector_search"):
+                return self.backend.query(vector, k)
+        except Exception as e:
+            print(f"❌ Error querying vector store: {e}")
+            return empty_result()
+
+    def query_many(self, vectors, k=3):
+        """
+        Top-k for a batch of query vectors in one backend call, results in input order
+        """
+        vectors = np.asarray(vectors)
+        if len(vectors) == 0:
+            return []
+        try:
+            self.refresh()
+            with metrics.span("vector_search"):
+                return self.backend.query_many(vectors, k)
         except Exception as e:
             print(f"❌ Error querying vector store: {e}")
-            return {"documents": [[]], "metadatas": [[]]}
\ No newline at end of file
+            return [empty_result() for _ in vectors]
@@ -0,0 +1,191 @@
+"""
+OpenRouterClient / AsyncOpenRouterClient retry, Retry-After and streaming
+behavior, driven through the injectable transport (no network).
+
+    python -m pytest -q tests
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import http_client  # noqa: E402
+from http_client import AsyncOpenRouterClient, OpenRouterClient, encode_request, with_model  # noqa: E402
+
+BODY = with_model(encode_request([{"role": "user", "content": "hi"}], max_tokens=5), "test/model")
+COMPLETION = {"choices": [{"message": {"content": "Hello"}}]}
+
+
+class ScriptedAdapter(BaseAdapter):
+    """requests transport answering from a list of (status, headers, body) tuples or exceptions"""
+    def __init__(self, script):
+        super().__init__()
+        self.script = list(script)
+        self.requests = []
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        self.requests.append((request, timeout))
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        status, headers, body = step
+        response = requests.Response()
+        response.status_code = status
+        response.reason = "scripted"
+        response.headers = CaseInsensitiveDict(headers)
+        response.raw = io.BytesIO(body if isinstance(body, bytes) else json.dumps(body).encode())
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record back-off delays instead of sleeping"""
+    delays = []
+    monkeypatch.setattr(http_client.time, "sleep", delays.append)
+    return delays
+
+
+def client(script, **kwargs):
+    adapter = ScriptedAdapter(script)
+    return OpenRouterClient("key", base_url="http://stub/v1", transport=adapter, **kwargs), adapter
+
+
+def test_with_model_splices_model_into_encoded_request():
+    assert json.loads(BODY) == {"model": "test/model", "messages": [{"role": "user", "content": "hi"}],
+                                "max_tokens": 5}
+
+
+def test_retries_retryable_status_then_succeeds(sleeps):
+    c, adapter = client([(503, {}, b"busy"), (200, {}, COMPLETION)], max_retries=2)
+    assert c.post(BODY) == COMPLETION
+    assert len(adapter.requests) == 2
+    assert len(sleeps) == 1
+    assert adapter.requests[0][0].headers["Authorization"] == "Bearer key"
+
+
+def test_retry_after_header_sets_the_delay(sleeps):
+    c, _ = client([(429, {"Retry-After": "2"}, b""), (200, {}, COMPLETION)])
+    c.post(BODY)
+    assert sleeps == [2.0]
+
+
+def test_retry_after_http_date():
+    response = requests.Response()
+    response.headers = CaseInsensitiveDict({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert http_client._retry_after(response) == 0.0
+    response.headers["Retry-After"] = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+    assert 25 < http_client._retry_after(response) <= 30
+
+
+def test_retry_after_past_deadline_gives_up_without_sleeping(sleeps):
+    c, adapter = client([(503, {"Retry-After": "60"}, b"")])
+    with pytest.raises(RuntimeError, match="503"):
+        c.post(BODY, deadline=time.monotonic() + 5)
+    assert sleeps == []
+    assert len(adapter.requests) == 1
+
+
+def test_non_retryable_status_fails_immediately(sleeps):
+    c, adapter = client([(400, {}, b"bad request")])
+    with pytest.raises(RuntimeError, match="400"):
+        c.post(BODY)
+    assert len(adapter.requests) == 1 and sleeps == []
+
+
+def test_gives_up_after_max_retries(sleeps):
+    c, adapter = client([(502, {}, b"")] * 3, max_retries=2)
+    with pytest.raises(RuntimeError, match="502"):
+        c.post(BODY)
+    assert len(adapter.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_connection_errors_are_retried(sleeps):
+    c, adapter = client([requests.exceptions.ConnectionError("reset"), (200, {}, COMPLETION)])
+    assert c.post(BODY) == COMPLETION
+    assert len(adapter.requests) == 2
+
+
+def test_timeouts_shrink_to_the_deadline(sleeps):
+    c, adapter = client([(200, {}, COMPLETION)], connect_timeout=5.0, read_timeout=30.0)
+    c.post(BODY, deadline=time.monotonic() + 3)
+    connect, read = adapter.requests[0][1]
+    assert read <= 3 and connect <= read
+
+
+def test_stream_yields_deltas_until_done():
+    events = [
+        b": OPENROUTER PROCESSING",
+        b"",
+        b'data: {"choices": [{"delta": {"content": "Hel"}}]}',
+        b'data: {"choices": [{"delta": {}}]}',
+        b'data: {"choices": [{"delta": {"content": "lo"}}]}',
+        b"data: [DONE]",
+        b'data: {"choices": [{"delta": {"content": "ignored"}}]}',
+    ]
+    c, _ = client([(200, {"Content-Type": "text/event-stream"}, b"\n".join(events) + b"\n")])
+    assert list(c.stream(BODY)) == ["Hel", "lo"]
+
+
+def test_stream_error_chunk_raises():
+    body = b'data: {"error": {"message": "rate limited"}}\n'
+    c, _ = client([(200, {}, body)])
+    with pytest.raises(RuntimeError, match="rate limited"):
+        list(c.stream(BODY))
+
+
+def test_async_client_retries_with_retry_after(monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(http_client.asyncio, "sleep", fake_sleep)
+    script = [httpx.Response(429, headers={"Retry-After": "1"}), httpx.Response(200, json=COMPLETION)]
+    seen = []
+
+    def handler(request):
+        seen.append(json.loads(request.content)["model"])
+        return script.pop(0)
+
+    async def run():
+        c = AsyncOpenRouterClient("key", base_url="http://stub/v1", transport=httpx.MockTransport(handler))
+        try:
+            return await c.post(BODY)
+        finally:
+            await c.aclose()
+
+    assert asyncio.run(run()) == COMPLETION
+    assert seen == ["test/model", "test/model"]
+    assert delays == [1.0]
+
+
+def test_async_client_non_retryable_status(monkeypatch):
+    httpx = pytest.importorskip("httpx")
+
+    async def run():
+        c = AsyncOpenRouterClient("key", base_url="http://stub/v1",
+                                  transport=httpx.MockTransport(lambda request: httpx.Response(401)))
+        try:
+            return await c.post(BODY)
+        finally:
+            await c.aclose()
+
+    with pytest.raises(RuntimeError, match="401"):
+        asyncio.run(run())
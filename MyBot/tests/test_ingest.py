@@ -0,0 +1,121 @@
+"""
+Ingestor.sync against the numpy vector backend on a temp dir, with an
+in-process loader, a one-chunk-per-file chunker and a hashing embedder.
+
+    python -m pytest -q tests
+"""
+
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+pytest.importorskip("langchain_community")     # ingest -> loader
+
+from ingest import Ingestor  # noqa: E402
+from vectorstore import VectorStore  # noqa: E402
+
+
+class Doc:
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+class FilesLoader:
+    """DataLoader stand-in: every *.txt of a directory, read in-process"""
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def files(self):
+        return [(path, self) for path in sorted(self.directory.glob("*.txt"))]
+
+    def load_file(self, path):
+        return [Doc(path.read_text(encoding="utf-8"), {"source": path.name})]
+
+
+class WholeDocChunker:
+    size = 300
+    overlap = 100
+
+    def split(self, docs):
+        return list(docs)
+
+
+class HashEmbedder:
+    name = "hash"
+    backend = "torch"
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        return np.stack([np.frombuffer(hashlib.sha256(t.encode()).digest(), dtype=np.uint8).astype(np.float32)
+                         for t in texts])
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "hours.txt").write_text("Visiting hours are 2-6pm.", encoding="utf-8")
+    (docs / "parking.txt").write_text("Parking is free for patients.", encoding="utf-8")
+    return docs
+
+
+def ingestor(tmp_path, corpus, embedder):
+    store = VectorStore(str(tmp_path / "store"), backend="numpy")
+    return Ingestor(FilesLoader(corpus), WholeDocChunker(), embedder, store, workers=1), store
+
+
+def test_unchanged_files_are_skipped(tmp_path, corpus):
+    embedder = HashEmbedder()
+    first, store = ingestor(tmp_path, corpus, embedder)
+    stats = first.sync()
+    assert stats["updated"] == 2 and stats["embedded"] == 2
+    assert store.count() == 2
+
+    # A fresh ingestor (next startup) only reads the manifest
+    embedder.encoded.clear()
+    again, store = ingestor(tmp_path, corpus, embedder)
+    stats = again.sync()
+    assert stats["unchanged"] == 2 and stats["embedded"] == 0
+    assert embedder.encoded == []
+    assert store.count() == 2
+
+
+def test_changed_file_is_re_embedded(tmp_path, corpus):
+    embedder = HashEmbedder()
+    ingestor(tmp_path, corpus, embedder)[0].sync()
+
+    hours = corpus / "hours.txt"
+    mtime = hours.stat().st_mtime
+    hours.write_text("Visiting hours are 3-5pm.", encoding="utf-8")
+    # Same size, so make sure the mtime moves even on a coarse clock
+    os.utime(hours, (mtime + 1, mtime + 1))
+    embedder.encoded.clear()
+    again, store = ingestor(tmp_path, corpus, embedder)
+    stats = again.sync()
+    assert stats["updated"] == 1 and stats["unchanged"] == 1 and stats["deleted_chunks"] == 1
+    assert embedder.encoded == ["Visiting hours are 3-5pm."]
+    assert store.count() == 2
+
+
+def test_deleted_files_are_removed(tmp_path, corpus):
+    embedder = HashEmbedder()
+    ingestor(tmp_path, corpus, embedder)[0].sync()
+
+    (corpus / "parking.txt").unlink()
+    again, store = ingestor(tmp_path, corpus, embedder)
+    stats = again.sync()
+    assert stats["removed"] == 1 and stats["deleted_chunks"] == 1
+    assert store.count() == 1
+    assert list(again.manifest.files) == [str(corpus / "hours.txt")]
+    assert store.query(embedder.encode(["Visiting hours are 2-6pm."])[0], k=3)["metadatas"][0] == \
+        [{"source": "hours.txt"}]
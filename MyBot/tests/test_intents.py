@@ -0,0 +1,70 @@
+"""
+Regression checks for the shipped data/intents.json routed by IntentRouter.
+
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+MYBOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(MYBOT, "src"))
+
+from intents import Intent, IntentRouter  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter.from_file(os.path.join(MYBOT, "data", "intents.json"))
+
+
+@pytest.mark.parametrize("query, name", [
+    ("book appointment", "book_appointment"),
+    ("Book appointments for tomorrow", "book_appointment"),
+    ("I'm booking an appointment", "book_appointment"),
+    ("booking appointments online?", "book_appointment"),
+    ("how to book a lab test", "how_to_book"),
+    ("How do I book?", "how_to_book"),
+    ("my doctor's appointments", "doctor_appointment"),
+    ("diagnostic tests", "diagnostic_test"),
+    ("Hi there!", "greeting"),
+    ("what about emergencies?", "emergency"),
+])
+def test_canned_matches(router, query, name):
+    intent = router.match(query, "canned")
+    assert intent is not None and intent.name == name
+
+
+@pytest.mark.parametrize("query", [
+    "this chemistry class",
+    "high blood pressure",
+    "they booked it",
+    "random words",
+])
+def test_canned_only_matches_whole_words(router, query):
+    assert router.match(query, "canned") is None
+
+
+@pytest.mark.parametrize("query, name", [
+    ("can I reschedule", "appointments"),
+    ("I need my test reports", "reports"),
+    ("refill my medications", "prescriptions"),
+    ("call an ambulance", "emergency"),
+])
+def test_fallback_topics(router, query, name):
+    assert router.match(query, "fallback").name == name
+
+
+def test_fallback_default(router):
+    assert router.answer("random words", "fallback") == router.defaults["fallback"]
+
+
+def test_longest_pattern_then_first_listed_wins():
+    first = Intent("first", "g", "a", ["book"], order=0)
+    second = Intent("second", "g", "b", ["book"], order=1)
+    longer = Intent("longer", "g", "c", ["book a room"], order=2)
+    router = IntentRouter([first, second, longer])
+    assert router.match("book it", "g") is first
+    assert router.match("please book a room", "g") is longer
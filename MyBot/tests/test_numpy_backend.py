@@ -0,0 +1,125 @@
+"""
+NumpyBackend round-trips, compaction and cross-instance refresh on a temp dir.
+
+    python -m pytest -q tests
+"""
+
+import glob
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from numpy_backend import NumpyBackend  # noqa: E402
+
+DIM = 16
+
+
+def vector(i):
+    """Unit vector along axis i, so each id has an exact nearest neighbour"""
+    v = np.zeros(DIM, dtype=np.float32)
+    v[i % DIM] = 1.0
+    return v
+
+
+def upsert(backend, ids, axes=None):
+    axes = range(len(ids)) if axes is None else axes
+    backend.upsert(list(ids), [f"doc {cid}" for cid in ids], [{"source": cid} for cid in ids],
+                   np.stack([vector(i) for i in axes]))
+
+
+def manifest(backend):
+    with open(backend.manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_upsert_then_query_round_trips(tmp_path, dtype):
+    backend = NumpyBackend(str(tmp_path), "docs", dtype=dtype)
+    upsert(backend, ["a", "b", "c"])
+    assert backend.count() == 3
+
+    result = backend.query(vector(1), k=2)
+    assert result["ids"][0][0] == "b"
+    assert result["documents"][0][0] == "doc b"
+    assert result["metadatas"][0][0] == {"source": "b"}
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-2)
+    assert len(result["ids"][0]) == 2
+
+
+def test_upsert_replaces_an_existing_id(tmp_path):
+    backend = NumpyBackend(str(tmp_path), "docs")
+    upsert(backend, ["a", "b"])
+    backend.upsert(["a"], ["new a"], [{"source": "a"}], vector(5)[None, :])
+
+    assert backend.count() == 2
+    result = backend.query(vector(5), k=1)
+    assert result["ids"] == [["a"]] and result["documents"] == [["new a"]]
+
+
+def test_delete_and_reset(tmp_path):
+    backend = NumpyBackend(str(tmp_path), "docs")
+    upsert(backend, ["a", "b", "c"])
+
+    backend.delete(["b", "missing"])
+    assert backend.count() == 2
+    assert "b" not in backend.query(vector(1), k=3)["ids"][0]
+
+    backend.reset()
+    assert backend.count() == 0
+    assert backend.query(vector(0))["ids"] == [[]]
+
+    upsert(backend, ["d"])
+    assert backend.query(vector(0), k=3)["ids"] == [["d"]]
+
+
+def test_small_segments_are_merged(tmp_path):
+    backend = NumpyBackend(str(tmp_path), "docs")
+    for i in range(8):
+        upsert(backend, [f"id{i}"], axes=[i])
+
+    segments = manifest(backend)["segments"]
+    assert backend.count() == 8
+    assert len(segments) <= 4
+    # Merged-away segments are removed from disk
+    assert len(glob.glob(os.path.join(str(tmp_path), "docs.seg*.json"))) == len(segments)
+    assert backend.query(vector(6), k=1)["ids"] == [["id6"]]
+
+
+def test_compaction_starts_a_new_epoch_once_tombstones_dominate(tmp_path):
+    backend = NumpyBackend(str(tmp_path), "docs")
+    upsert(backend, [f"id{i}" for i in range(8)])
+    epoch = manifest(backend)["epoch"]
+
+    backend.delete([f"id{i}" for i in range(6)])
+    m = manifest(backend)
+    assert m["epoch"] == epoch + 1
+    assert m["tombstones"] == 0 and len(m["segments"]) == 1
+    assert backend.count() == 2
+    assert backend.query(vector(7), k=3)["ids"][0][0] == "id7"
+    assert not os.path.exists(backend._tombstone_path(epoch))
+
+
+def test_second_instance_sees_writes_after_refresh(tmp_path):
+    writer = NumpyBackend(str(tmp_path), "docs")
+    reader = NumpyBackend(str(tmp_path), "docs")
+
+    upsert(writer, ["a", "b"])
+    assert reader.count() == 0
+    assert reader.refresh() is True
+    assert reader.count() == 2
+    assert reader.query(vector(1), k=1)["ids"] == [["b"]]
+    assert reader.refresh() is False
+
+    writer.delete(["b"])
+    reader.refresh()
+    assert reader.count() == 1
+    assert reader.query(vector(1), k=2)["ids"] == [["a"]]
+
+    writer.reset()
+    reader.refresh()
+    assert reader.count() == 0
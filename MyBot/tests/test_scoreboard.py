@@ -0,0 +1,78 @@
+"""
+ModelScoreboard circuit breaker (closed -> open -> half-open trial -> closed)
+and ranking, on a fake clock.
+
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import scoreboard  # noqa: E402
+from scoreboard import ModelScoreboard  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Advance time by hand: clock[0] is what time.monotonic() returns"""
+    now = [1000.0]
+    monkeypatch.setattr(scoreboard.time, "monotonic", lambda: now[0])
+    return now
+
+
+def tripped(clock, **kwargs):
+    board = ModelScoreboard(["a", "b"], failure_threshold=2, cooldown=10.0, **kwargs)
+    board.record("a", 0.1, ok=False)
+    board.record("a", 0.1, ok=False)
+    return board
+
+
+def test_open_then_trial_then_closed(clock):
+    board = tripped(clock)
+    assert board.snapshot()["a"]["circuit"] == "open"
+    assert board.ordered() == ["b"]
+    assert not board.acquire("a")
+
+    clock[0] += 11
+    assert board.snapshot()["a"]["circuit"] == "half_open"
+    assert "a" in board.ordered()
+    assert board.acquire("a")
+    # Only one caller gets the trial
+    assert not board.acquire("a")
+    assert "a" not in board.ordered()
+
+    board.record("a", 0.1, ok=True, validated=True)
+    assert board.snapshot()["a"]["circuit"] == "closed"
+    assert board.acquire("a") and board.acquire("a")
+
+
+def test_failed_trial_reopens(clock):
+    board = tripped(clock)
+    clock[0] += 11
+    assert board.acquire("a")
+    board.record("a", 0.1, ok=False)
+    assert board.snapshot()["a"]["circuit"] == "open"
+    assert not board.acquire("a")
+
+
+def test_released_or_timed_out_trial_is_handed_out_again(clock):
+    board = tripped(clock, trial_timeout=5.0)
+    clock[0] += 11
+    assert board.acquire("a")
+    board.release("a")
+    assert board.acquire("a")
+
+    clock[0] += 6
+    assert board.acquire("a")
+
+
+def test_ordered_ranks_by_validated_rate_then_configured_order(clock):
+    board = ModelScoreboard(["a", "b", "c"])
+    assert board.ordered() == ["a", "b", "c"]
+    board.record("c", 0.1, ok=True, validated=True)
+    board.record("a", 0.1, ok=True, validated=False)
+    assert board.ordered() == ["c", "b", "a"]
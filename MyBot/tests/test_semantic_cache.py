@@ -0,0 +1,61 @@
+"""
+SemanticCache hits, misses and persistence on a temp dir.
+
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from semantic_cache import SemanticCache, context_fingerprint  # noqa: E402
+
+QUESTION = np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+PARAPHRASE = np.array([0.98, 0.2, 0.0, 0.0], dtype=np.float32)
+UNRELATED = np.array([0.0, 1.0, 0.0, 0.0], dtype=np.float32)
+CONTEXT = "Visiting hours are 2-6pm.\n\nParking is free."
+
+
+def cache(tmp_path, **kwargs):
+    return SemanticCache(path=str(tmp_path), threshold=0.9, **kwargs)
+
+
+def test_paraphrase_over_the_same_context_hits(tmp_path):
+    c = cache(tmp_path)
+    fingerprint = context_fingerprint(CONTEXT)
+    c.put("when can i visit", QUESTION, fingerprint, "2-6pm")
+
+    assert c.lookup(PARAPHRASE, fingerprint) == "2-6pm"
+    assert c.lookup(UNRELATED, fingerprint) is None
+    assert c.stats()["hits"] == 1 and c.stats()["misses"] == 1
+
+
+def test_fingerprint_change_misses(tmp_path):
+    c = cache(tmp_path)
+    c.put("when can i visit", QUESTION, context_fingerprint(CONTEXT), "2-6pm")
+
+    assert c.lookup(QUESTION, context_fingerprint("Visiting hours are 3-5pm.")) is None
+    # Reordered chunks are the same context
+    assert c.lookup(QUESTION, context_fingerprint("Parking is free.\n\nVisiting hours are 2-6pm.")) == "2-6pm"
+
+
+def test_answers_persist_across_instances(tmp_path):
+    fingerprint = context_fingerprint(CONTEXT)
+    cache(tmp_path).put("when can i visit", QUESTION, fingerprint, "2-6pm")
+    assert cache(tmp_path).lookup(PARAPHRASE, fingerprint) == "2-6pm"
+
+
+def test_expired_and_evicted_entries_miss(tmp_path):
+    fingerprint = context_fingerprint(CONTEXT)
+    c = cache(tmp_path, ttl=0)
+    c.put("when can i visit", QUESTION, fingerprint, "2-6pm")
+    assert c.lookup(QUESTION, fingerprint) is None
+
+    c = cache(tmp_path / "lru", maxsize=1)
+    c.put("when can i visit", QUESTION, fingerprint, "2-6pm")
+    c.put("where do i park", UNRELATED, fingerprint, "Parking is free")
+    assert c.lookup(QUESTION, fingerprint) is None
+    assert c.lookup(UNRELATED, fingerprint) == "Parking is free"